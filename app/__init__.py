@@ -1,9 +1,16 @@
 # app/__init__.py
-from .main import app
 from . import models, schemas, database, auth
 
-# Optional: Initialize database models
+# The FastAPI app is imported on first access, so seed.py and the migrations
+# can use the models without loading every route
+def __getattr__(name):
+    if name == "app":
+        from .main import app
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+# Creates tables directly, for throwaway databases; deployments run `alembic upgrade head`
 def init_db():
     models.Base.metadata.create_all(bind=database.engine)
 
-__all__ = ["app", "models", "schemas", "database", "auth", "init_db"]
\ No newline at end of file
+__all__ = ["app", "models", "schemas", "database", "auth", "init_db"]
@@ -0,0 +1,276 @@
+import time
+from collections import Counter, defaultdict
+from typing import Callable, Iterable, List, Mapping, NamedTuple, Optional, Tuple
+
+from fastapi import APIRouter, Depends, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import delete, distinct, func, insert, select, text, tuple_
+from sqlalchemy.orm import Session
+
+from . import models, schemas
+from .auth import get_current_user
+from .database import get_db, insert_for
+from .pagination import cursor_keys, iter_csv, set_next_cursor
+from .response_cache import encode, response_cache
+
+# Reports read the summary tables, whose size follows courses x semesters and
+# students x semesters rather than the number of enrollments. Every enrollment
+# insert adds its deltas in the same transaction (record_enrollments), so the
+# summaries are exact; refresh() rebuilds them after out-of-band changes.
+router = APIRouter(prefix="/analytics", tags=["analytics"])
+
+COURSE_STATS = models.CourseSemesterStat.__table__
+CREDIT_LOADS = models.StudentCreditLoad.__table__
+ANALYTICS_TAG = "analytics"
+
+
+def record_enrollments(db: Session, enrollments: Iterable[Mapping]):
+    """Add newly inserted enrollments to the summaries, before the caller commits."""
+    enrollments = list(enrollments)
+    if not enrollments:
+        return
+    credits = dict(db.execute(
+        select(models.Course.id, models.Course.credits)
+        .where(models.Course.id.in_({enrollment["course_id"] for enrollment in enrollments}))
+    ).all())
+
+    per_course = Counter((enrollment["course_id"], enrollment["semester"]) for enrollment in enrollments)
+    per_student = defaultdict(lambda: [0, 0])
+    for enrollment in enrollments:
+        load = per_student[(enrollment["student_id"], enrollment["semester"])]
+        load[0] += 1
+        load[1] += credits.get(enrollment["course_id"]) or 0
+
+    # Sorted keys keep row-lock order consistent between concurrent writers
+    insert_stmt = insert_for(db)(COURSE_STATS)
+    db.execute(
+        insert_stmt.on_conflict_do_update(
+            index_elements=["course_id", "semester"],
+            set_={"enrollment_count": COURSE_STATS.c.enrollment_count + insert_stmt.excluded.enrollment_count},
+        ),
+        [
+            {"course_id": course_id, "semester": semester, "enrollment_count": count}
+            for (course_id, semester), count in sorted(per_course.items())
+        ],
+    )
+    insert_stmt = insert_for(db)(CREDIT_LOADS)
+    db.execute(
+        insert_stmt.on_conflict_do_update(
+            index_elements=["student_id", "semester"],
+            set_={
+                "course_count": CREDIT_LOADS.c.course_count + insert_stmt.excluded.course_count,
+                "credits": CREDIT_LOADS.c.credits + insert_stmt.excluded.credits,
+            },
+        ),
+        [
+            {"student_id": student_id, "semester": semester, "course_count": count, "credits": total}
+            for (student_id, semester), (count, total) in sorted(per_student.items())
+        ],
+    )
+
+
+def refresh(db: Session) -> schemas.SummaryRefresh:
+    """Rebuild both summaries from the enrollments table in one transaction."""
+    started = time.perf_counter()
+    if db.get_bind().dialect.name == "postgresql":
+        # Writers block on their summary upsert until the rebuild commits, so
+        # each enrollment is counted either by the rebuild or by its writer
+        db.execute(text(f"LOCK TABLE {COURSE_STATS.name}, {CREDIT_LOADS.name} IN EXCLUSIVE MODE"))
+    db.execute(delete(COURSE_STATS))
+    db.execute(delete(CREDIT_LOADS))
+
+    enrollment = models.Enrollment
+    course_rows = db.execute(insert(COURSE_STATS).from_select(
+        ["course_id", "semester", "enrollment_count"],
+        select(enrollment.course_id, enrollment.semester, func.count())
+        .group_by(enrollment.course_id, enrollment.semester),
+    )).rowcount
+    student_rows = db.execute(insert(CREDIT_LOADS).from_select(
+        ["student_id", "semester", "course_count", "credits"],
+        select(
+            enrollment.student_id, enrollment.semester, func.count(),
+            func.coalesce(func.sum(models.Course.credits), 0),
+        )
+        .join(models.Course, models.Course.id == enrollment.course_id)
+        .group_by(enrollment.student_id, enrollment.semester),
+    )).rowcount
+    db.commit()
+    response_cache.invalidate(ANALYTICS_TAG)
+    return schemas.SummaryRefresh(
+        course_semester_rows=course_rows,
+        student_credit_rows=student_rows,
+        elapsed_seconds=round(time.perf_counter() - started, 3),
+    )
+
+
+def course_enrollments_query(semester: Optional[str] = None, course_id: Optional[int] = None):
+    stmt = (
+        select(
+            COURSE_STATS.c.course_id,
+            models.Course.code,
+            models.Course.name,
+            COURSE_STATS.c.semester,
+            COURSE_STATS.c.enrollment_count,
+            (COURSE_STATS.c.enrollment_count * func.coalesce(models.Course.credits, 0)).label("credit_hours"),
+        )
+        .join(models.Course, models.Course.id == COURSE_STATS.c.course_id)
+        .where(COURSE_STATS.c.enrollment_count > 0)
+        .order_by(COURSE_STATS.c.course_id, COURSE_STATS.c.semester)
+    )
+    if semester:
+        stmt = stmt.where(COURSE_STATS.c.semester == semester)
+    if course_id is not None:
+        stmt = stmt.where(COURSE_STATS.c.course_id == course_id)
+    return stmt
+
+
+def credit_loads_query(semester: Optional[str] = None, department: Optional[str] = None):
+    stmt = (
+        select(
+            CREDIT_LOADS.c.student_id,
+            models.Student.name,
+            models.Student.department,
+            CREDIT_LOADS.c.semester,
+            CREDIT_LOADS.c.course_count,
+            CREDIT_LOADS.c.credits,
+        )
+        .join(models.Student, models.Student.id == CREDIT_LOADS.c.student_id)
+        .where(CREDIT_LOADS.c.course_count > 0)
+        .order_by(CREDIT_LOADS.c.student_id, CREDIT_LOADS.c.semester)
+    )
+    if semester:
+        stmt = stmt.where(CREDIT_LOADS.c.semester == semester)
+    if department:
+        stmt = stmt.where(models.Student.department == department)
+    return stmt
+
+
+class Report(NamedTuple):
+    query: Callable
+    keys: Tuple  # keyset columns, matching the query's ORDER BY
+    schema: type
+
+
+# Served page by page below and exported in chunks by report jobs (app/jobs.py)
+REPORTS = {
+    "course-enrollments": Report(
+        course_enrollments_query, (COURSE_STATS.c.course_id, COURSE_STATS.c.semester), schemas.CourseEnrollmentStat
+    ),
+    "credit-loads": Report(
+        credit_loads_query, (CREDIT_LOADS.c.student_id, CREDIT_LOADS.c.semester), schemas.CreditLoad
+    ),
+}
+
+
+def _export(db: Session, stmt, fields, filename: str) -> StreamingResponse:
+    rows = db.execute(stmt.execution_options(yield_per=1000))
+    return StreamingResponse(
+        iter_csv(rows, fields),
+        media_type="text/csv",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+@router.get("/course-enrollments", response_model=List[schemas.CourseEnrollmentStat])
+def course_enrollments(
+    response: Response,
+    semester: Optional[str] = Query(None),
+    course_id: Optional[int] = Query(None),
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = Query(None, description="Keyset cursor from the X-Next-Cursor header"),
+    format: str = Query("json", regex="^(json|csv)$"),
+    db: Session = Depends(get_db),
+    current_user: schemas.TokenData = Depends(get_current_user)
+):
+    """Enrollments and credit hours per course and semester."""
+    stmt = course_enrollments_query(semester, course_id)
+    if format == "csv":
+        return _export(db, stmt, list(schemas.CourseEnrollmentStat.__fields__), "course_enrollments.csv")
+
+    after = cursor_keys(cursor, ("course_id", "semester"), filter_semester=semester, filter_course_id=course_id)
+    if after is not None:
+        stmt = stmt.where(tuple_(*REPORTS["course-enrollments"].keys) > after)
+    rows = db.execute(stmt.limit(limit)).all()
+    set_next_cursor(response, rows, limit, lambda row: {
+        "filter_semester": semester, "filter_course_id": course_id,
+        "course_id": row.course_id, "semester": row.semester,
+    })
+    return rows
+
+
+@router.get("/credit-loads", response_model=List[schemas.CreditLoad])
+def credit_loads(
+    response: Response,
+    semester: Optional[str] = Query(None),
+    department: Optional[str] = Query(None),
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = Query(None, description="Keyset cursor from the X-Next-Cursor header"),
+    format: str = Query("json", regex="^(json|csv)$"),
+    db: Session = Depends(get_db),
+    current_user: schemas.TokenData = Depends(get_current_user)
+):
+    """Courses and credits per student and semester; use format=csv for a full export."""
+    stmt = credit_loads_query(semester, department)
+    if format == "csv":
+        return _export(db, stmt, list(schemas.CreditLoad.__fields__), "credit_loads.csv")
+
+    after = cursor_keys(cursor, ("student_id", "semester"), filter_semester=semester, department=department)
+    if after is not None:
+        stmt = stmt.where(tuple_(*REPORTS["credit-loads"].keys) > after)
+    rows = db.execute(stmt.limit(limit)).all()
+    set_next_cursor(response, rows, limit, lambda row: {
+        "filter_semester": semester, "department": department,
+        "student_id": row.student_id, "semester": row.semester,
+    })
+    return rows
+
+
+@router.get("/departments", response_model=List[schemas.DepartmentStat])
+def departments(
+    request: Request,
+    semester: Optional[str] = Query(None),
+    db: Session = Depends(get_db),
+    current_user: schemas.TokenData = Depends(get_current_user)
+):
+    """Department sizes plus enrollment and credit totals.
+
+    Cached for RESPONSE_CACHE_TTL seconds rather than invalidated per write:
+    every enrollment would otherwise evict it.
+    """
+    cache_key, cached = response_cache.lookup(request, f"analytics:departments:{semester}", [ANALYTICS_TAG])
+    if cached:
+        return cached
+
+    sizes = db.execute(
+        select(models.Student.department, func.count()).group_by(models.Student.department)
+    ).all()
+    loads = select(
+        models.Student.department,
+        func.count(distinct(CREDIT_LOADS.c.student_id)),
+        func.sum(CREDIT_LOADS.c.course_count),
+        func.sum(CREDIT_LOADS.c.credits),
+    ).join(models.Student, models.Student.id == CREDIT_LOADS.c.student_id).group_by(models.Student.department)
+    if semester:
+        loads = loads.where(CREDIT_LOADS.c.semester == semester)
+    totals = {department: rest for department, *rest in db.execute(loads).all()}
+
+    report = []
+    for department, students in sorted(sizes, key=lambda row: row[0] or ""):
+        enrolled, enrollments, credits = totals.get(department, (0, 0, 0))
+        report.append(schemas.DepartmentStat(
+            department=department or "",
+            students=students,
+            enrolled_students=enrolled,
+            enrollments=enrollments or 0,
+            credits=credits or 0,
+        ))
+    return response_cache.store(request, cache_key, encode(report))
+
+
+@router.post("/refresh", response_model=schemas.SummaryRefresh)
+def refresh_summaries(
+    db: Session = Depends(get_db),
+    current_user: schemas.TokenData = Depends(get_current_user)
+):
+    """Rebuild the summary tables from enrollments (after manual SQL, restores, ...)."""
+    return refresh(db)
@@ -0,0 +1,265 @@
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import analytics, models, schemas, search, writes
+from .auth import get_current_user
+from .database import get_async_db
+from .pagination import aiter_ndjson, cursor_position, next_cursor_headers
+from .response_cache import department_tag, encode, response_cache, roster_tag, student_tag
+from .serialization import encode_rows, json_response
+
+# Async twins of the student, enrollment and search routes in app/main.py,
+# mounted instead of them when ASYNC_DB is enabled
+router = APIRouter()
+
+
+async def _get_student(db: AsyncSession, student_id: int) -> models.Student:
+    student = await db.get(models.Student, student_id)
+    if not student:
+        raise HTTPException(status_code=404, detail="Student not found")
+    return student
+
+
+async def _student_cache_tags(db: AsyncSession, student_id: int) -> Optional[List[str]]:
+    rows = (await db.execute(
+        select(models.Student.department, models.Enrollment.course_id)
+        .outerjoin(models.Enrollment, models.Enrollment.student_id == models.Student.id)
+        .where(models.Student.id == student_id)
+        .distinct()
+    )).all()
+    if not rows:
+        return None
+    return [
+        student_tag(student_id),
+        department_tag(rows[0].department),
+        *(roster_tag(row.course_id) for row in rows if row.course_id is not None),
+    ]
+
+
+@router.post("/students/", response_model=schemas.Student, status_code=status.HTTP_201_CREATED)
+async def create_student(
+    student: schemas.StudentCreate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.TokenData = Depends(get_current_user)
+):
+    db_student = (await db.execute(writes.insert_student(db, student.dict()))).first()
+    if db_student is None:
+        raise HTTPException(status_code=400, detail="Email already registered")
+    await db.commit()
+    search.index_student(db_student)
+    response_cache.invalidate(department_tag(db_student.department))
+    return db_student
+
+
+@router.get("/students/", response_model=List[schemas.Student])
+async def read_students(
+    request: Request,
+    skip: int = 0,
+    limit: int = 100,
+    department: Optional[str] = Query(None),
+    cursor: Optional[str] = Query(None, description="Keyset cursor from the X-Next-Cursor header"),
+    format: str = Query("json", regex="^(json|ndjson)$"),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.TokenData = Depends(get_current_user)
+):
+    stmt = select(*models.STUDENT_COLUMNS)
+    if department:
+        stmt = stmt.where(models.Student.department == department)
+
+    after_id = cursor_position(cursor, department=department)
+    if after_id is not None:
+        stmt = stmt.where(models.Student.id > after_id)
+        skip = 0
+    stmt = stmt.order_by(models.Student.id)
+
+    if format == "ndjson":
+        result = await db.stream(stmt.offset(skip))
+        return StreamingResponse(aiter_ndjson(result, models.STUDENT_FIELDS), media_type="application/x-ndjson")
+
+    if not department:
+        students = (await db.execute(stmt.offset(skip).limit(limit))).all()
+        return json_response(
+            encode_rows(students, models.STUDENT_FIELDS, schemas.Student),
+            next_cursor_headers(students, limit, lambda s: {"department": department, "id": s.id}),
+        )
+
+    cache_key, cached = response_cache.lookup(
+        request, f"students:{department}:{skip}:{limit}:{after_id}", [department_tag(department)]
+    )
+    if cached:
+        return cached
+    students = (await db.execute(stmt.offset(skip).limit(limit))).all()
+    return response_cache.store(
+        request, cache_key,
+        encode_rows(students, models.STUDENT_FIELDS, schemas.Student),
+        next_cursor_headers(students, limit, lambda s: {"department": department, "id": s.id}),
+    )
+
+
+@router.get("/students/{student_id}", response_model=schemas.Student)
+async def read_student(
+    student_id: int,
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.TokenData = Depends(get_current_user)
+):
+    cache_key, cached = response_cache.lookup(request, f"student:{student_id}", [student_tag(student_id)])
+    if cached:
+        return cached
+    student = await _get_student(db, student_id)
+    return response_cache.store(request, cache_key, encode(schemas.Student.from_orm(student)))
+
+
+@router.put("/students/{student_id}", response_model=schemas.Student)
+async def update_student(
+    student_id: int,
+    student: schemas.StudentCreate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.TokenData = Depends(get_current_user)
+):
+    cache_tags = await _student_cache_tags(db, student_id)
+    if cache_tags is None:
+        raise HTTPException(status_code=404, detail="Student not found")
+
+    try:
+        db_student = (await db.execute(writes.update_student(student_id, student.dict()))).first()
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(status_code=400, detail="Email already registered")
+    if db_student is None:
+        raise HTTPException(status_code=404, detail="Student not found")
+
+    search.index_student(db_student)
+    response_cache.invalidate(*cache_tags, department_tag(db_student.department))
+    return db_student
+
+
+@router.delete("/students/{student_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_student(
+    student_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.TokenData = Depends(get_current_user)
+):
+    student = await _get_student(db, student_id)
+    cache_tags = await _student_cache_tags(db, student_id)
+    await db.delete(student)
+    try:
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(status_code=400, detail="Student has enrollments")
+    response_cache.invalidate(*cache_tags)
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+
+@router.post("/enrollments/", response_model=schemas.Enrollment, status_code=status.HTTP_201_CREATED)
+async def create_enrollment(
+    enrollment: schemas.EnrollmentCreate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.TokenData = Depends(get_current_user)
+):
+    try:
+        db_enrollment = (await db.execute(writes.insert_enrollment(db, enrollment.dict()))).first()
+    except IntegrityError:
+        await db.rollback()
+        student_exists, course_exists = (await db.execute(
+            writes.missing_references(enrollment.student_id, enrollment.course_id)
+        )).one()
+        if not student_exists:
+            raise HTTPException(status_code=404, detail="Student not found")
+        if not course_exists:
+            raise HTTPException(status_code=404, detail="Course not found")
+        raise
+    if db_enrollment is None:
+        raise HTTPException(status_code=400, detail="Duplicate enrollment")
+    await db.run_sync(analytics.record_enrollments, [db_enrollment._mapping])
+    await db.commit()
+    response_cache.invalidate(roster_tag(enrollment.course_id))
+    return db_enrollment
+
+
+@router.post("/enrollments/batch", response_model=schemas.EnrollmentBatchResult, status_code=status.HTTP_201_CREATED)
+async def create_enrollments(
+    batch: schemas.EnrollmentBatchCreate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.TokenData = Depends(get_current_user)
+):
+    existing = (await db.execute(writes.existing_ids(batch.student_ids, batch.course_ids))).all()
+    missing = writes.missing_ids(existing, batch.student_ids, batch.course_ids)
+    if missing:
+        raise HTTPException(status_code=404, detail={"message": "Students or courses not found", **missing})
+    try:
+        created = (await db.execute(
+            writes.insert_enrollments(db, batch.student_ids, batch.course_ids, batch.semester)
+        )).all()
+        await db.run_sync(analytics.record_enrollments, [row._mapping for row in created])
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(status_code=404, detail="Students or courses not found")
+
+    response_cache.invalidate(*(roster_tag(course_id) for course_id in batch.course_ids))
+    requested = len(set(batch.student_ids)) * len(set(batch.course_ids))
+    return schemas.EnrollmentBatchResult(
+        requested=requested,
+        created=len(created),
+        already_enrolled=requested - len(created),
+        enrollments=created,
+    )
+
+
+@router.get("/courses/{course_id}/students", response_model=List[schemas.Student])
+async def get_course_students(
+    course_id: int,
+    request: Request,
+    semester: Optional[str] = Query(None),
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = Query(None, description="Keyset cursor from the X-Next-Cursor header"),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.TokenData = Depends(get_current_user)
+):
+    after_id = cursor_position(cursor, course_id=course_id, semester=semester)
+    cache_key, cached = response_cache.lookup(
+        request, f"roster:{course_id}:{semester}:{limit}:{after_id}", [roster_tag(course_id)]
+    )
+    if cached:
+        return cached
+
+    enrolled = select(models.Enrollment.student_id).where(models.Enrollment.course_id == course_id)
+    if semester:
+        enrolled = enrolled.where(models.Enrollment.semester == semester)
+    stmt = select(*models.STUDENT_COLUMNS).where(models.Student.id.in_(enrolled))
+    if after_id is not None:
+        stmt = stmt.where(models.Student.id > after_id)
+    students = (await db.execute(stmt.order_by(models.Student.id).limit(limit))).all()
+
+    if not students and await db.get(models.Course, course_id) is None:
+        raise HTTPException(status_code=404, detail="Course not found")
+    return response_cache.store(
+        request, cache_key,
+        encode_rows(students, models.STUDENT_FIELDS, schemas.Student),
+        next_cursor_headers(students, limit, lambda s: {"course_id": course_id, "semester": semester, "id": s.id}),
+    )
+
+
+@router.get("/search/students", response_model=List[schemas.Student])
+async def search_students(
+    q: str = Query(..., min_length=2),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="Cursor from the X-Next-Cursor header"),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.TokenData = Depends(get_current_user)
+):
+    offset = cursor_position(cursor, key="offset", q=q) or 0
+    # The search engine is shared with the sync routes; run it on the session's greenlet
+    students = await db.run_sync(lambda session: search.search_students(session, q, limit, offset))
+    return json_response(
+        encode_rows(students, models.STUDENT_FIELDS, schemas.Student),
+        next_cursor_headers(students, limit, lambda s: {"q": q, "offset": offset + limit}),
+    )
@@ -1,10 +1,21 @@
 from datetime import datetime, timedelta
 from jose import JWTError, jwt
 from passlib.context import CryptContext
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordBearer
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
+from . import models
+from .cache import TTLCache
+from .database import SessionLocal
+from .metrics import LatencyStats
 from .schemas import TokenData
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import asyncio
+import hashlib
+import ipaddress
 import os
+import threading
+import time
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -13,6 +24,13 @@ SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-here")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
+# Verified tokens and user records; the TTL bounds how long another worker
+# can keep accepting a token after a password change
+AUTH_CACHE_SIZE = int(os.getenv("AUTH_CACHE_SIZE", "10000"))
+AUTH_CACHE_TTL = float(os.getenv("AUTH_CACHE_TTL", "60"))
+_token_cache = TTLCache(AUTH_CACHE_SIZE, AUTH_CACHE_TTL)  # sha256(token) -> (username, pv, exp)
+_user_cache = TTLCache(AUTH_CACHE_SIZE, AUTH_CACHE_TTL)   # username -> (TokenData, pv)
+
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
@@ -22,6 +40,156 @@ def verify_password(plain_password, hashed_password):
 def get_password_hash(password):
     return pwd_context.hash(password)
 
+# bcrypt is deliberately slow, so it runs on a bounded pool instead of the event
+# loop. HASH_WORKERS caps concurrent hashes and HASH_QUEUE_LIMIT caps waiters;
+# beyond that logins get 503 rather than piling up.
+HASH_EXECUTOR = os.getenv("HASH_EXECUTOR", "thread")
+HASH_WORKERS = int(os.getenv("HASH_WORKERS", "4"))
+HASH_QUEUE_LIMIT = int(os.getenv("HASH_QUEUE_LIMIT", "64"))
+
+def _timed(fn, *args):
+    started = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - started
+
+class HashPool:
+    def __init__(self, kind: str, workers: int, queue_limit: int):
+        self.kind = kind
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self.in_flight = 0
+        self.rejected = 0
+        self.hash_latency = LatencyStats()
+        self.wait_latency = LatencyStats()
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        if self._executor is None:
+            executor_class = ProcessPoolExecutor if self.kind == "process" else ThreadPoolExecutor
+            self._executor = executor_class(max_workers=self.workers)
+        return self._executor
+
+    async def run(self, fn, *args):
+        with self._lock:
+            if self.in_flight >= self.workers + self.queue_limit:
+                self.rejected += 1
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="Too many concurrent logins, retry shortly",
+                    headers={"Retry-After": "1"},
+                )
+            self.in_flight += 1
+        started = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            result, hashing = await loop.run_in_executor(self._get_executor(), _timed, fn, *args)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+        self.hash_latency.observe(hashing)
+        self.wait_latency.observe(time.perf_counter() - started - hashing)
+        return result
+
+    def snapshot(self) -> dict:
+        return {
+            "executor": self.kind,
+            "workers": self.workers,
+            "queue_limit": self.queue_limit,
+            "in_flight": self.in_flight,
+            "rejected": self.rejected,
+            "hash": self.hash_latency.snapshot(),
+            "queue_wait": self.wait_latency.snapshot(),
+        }
+
+hash_pool = HashPool(HASH_EXECUTOR, HASH_WORKERS, HASH_QUEUE_LIMIT)
+
+async def averify_password(plain_password, hashed_password):
+    return await hash_pool.run(verify_password, plain_password, hashed_password)
+
+async def aget_password_hash(password):
+    return await hash_pool.run(get_password_hash, password)
+
+class RateLimiter:
+    """Fixed-window attempt counter per key."""
+
+    def __init__(self, limit: int, window: float, maxsize: int = 100000):
+        self.limit = limit
+        self.window = window
+        self.limited = 0
+        self._windows = TTLCache(maxsize, window)
+        self._lock = threading.Lock()
+
+    def retry_after(self, key, count: bool = True):
+        """Seconds until `key` may retry, or None; `count` records this attempt."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._windows.get(key)
+            if entry is None:
+                entry = [now, 0]
+                self._windows.set(key, entry)
+            if count:
+                entry[1] += 1
+            if entry[1] > self.limit or (not count and entry[1] >= self.limit):
+                self.limited += 1
+                return max(1, int(entry[0] + self.window - now))
+        return None
+
+# Only failed attempts count, per client IP and per username and client IP, so
+# successful logins are never throttled and a flood against an account from one
+# address locks out that address only, never the owner logging in from elsewhere.
+LOGIN_RATE_WINDOW = float(os.getenv("LOGIN_RATE_WINDOW", "60"))
+ip_limiter = RateLimiter(int(os.getenv("LOGIN_FAILURES_PER_IP", "100")), LOGIN_RATE_WINDOW)
+username_limiter = RateLimiter(int(os.getenv("LOGIN_FAILURES_PER_USER", "5")), LOGIN_RATE_WINDOW)
+
+# Behind a load balancer request.client is the proxy. Its addresses (IPs or
+# CIDRs, comma separated) in TRUSTED_PROXIES make X-Forwarded-For authoritative.
+TRUSTED_PROXIES = [
+    ipaddress.ip_network(proxy.strip(), strict=False)
+    for proxy in os.getenv("TRUSTED_PROXIES", "").split(",") if proxy.strip()
+]
+
+def _trusted_proxy(host: str) -> bool:
+    try:
+        address = ipaddress.ip_address(host)
+    except ValueError:
+        return False
+    return any(address in network for network in TRUSTED_PROXIES)
+
+def client_address(request: Request) -> str:
+    """The caller's address: the last X-Forwarded-For hop not added by a trusted proxy."""
+    host = request.client.host if request.client else "unknown"
+    if not _trusted_proxy(host):
+        return host
+    forwarded = ",".join(request.headers.getlist("x-forwarded-for"))
+    for hop in reversed([hop.strip() for hop in forwarded.split(",") if hop.strip()]):
+        host = hop
+        if not _trusted_proxy(hop):
+            break
+    return host
+
+def enforce_login_rate(username: str, client_ip: str):
+    retry_after = (
+        ip_limiter.retry_after(client_ip, count=False)
+        or username_limiter.retry_after((username, client_ip), count=False)
+    )
+    if retry_after:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many login attempts",
+            headers={"Retry-After": str(retry_after)},
+        )
+
+def record_login_failure(username: str, client_ip: str):
+    ip_limiter.retry_after(client_ip)
+    username_limiter.retry_after((username, client_ip))
+
+def login_metrics() -> dict:
+    return {
+        "hash_pool": hash_pool.snapshot(),
+        "rate_limited": {"ip": ip_limiter.limited, "username": username_limiter.limited},
+    }
+
 def create_access_token(data: dict, expires_delta: timedelta = None):
     to_encode = data.copy()
     if expires_delta:
@@ -32,23 +200,53 @@ def create_access_token(data: dict, expires_delta: timedelta = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
+def password_fingerprint(hashed_password: str) -> str:
+    """Short digest of the stored hash, embedded in tokens as the "pv" claim.
+
+    Changing the password changes the hash, so older tokens stop verifying.
+    """
+    return hashlib.sha256(hashed_password.encode()).hexdigest()[:16]
+
+def cache_user(user: models.User):
+    entry = (TokenData(username=user.username), password_fingerprint(user.hashed_password))
+    _user_cache.set(user.username, entry)
+    return entry
+
+def invalidate_user(username: str):
+    _user_cache.pop(username)
+    _token_cache.pop_matching(lambda entry: entry[0] == username)
+
+def _load_user(username: str):
+    # Return the entry itself: with the cache disabled, set() keeps nothing
+    with SessionLocal() as db:
+        user = db.query(models.User).filter(models.User.username == username).first()
+        return cache_user(user) if user else None
+
 async def get_current_user(token: str = Depends(oauth2_scheme)):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get("sub")
-        if username is None:
+    digest = hashlib.sha256(token.encode()).digest()
+    cached = _token_cache.get(digest)
+    if cached is None:
+        try:
+            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        except JWTError:
+            raise credentials_exception
+        username = payload.get("sub")
+        if username is None or payload.get("exp") is None:
             raise credentials_exception
-        token_data = TokenData(username=username)
-    except JWTError:
+        cached = (username, payload.get("pv"), payload["exp"])
+        _token_cache.set(digest, cached, ttl=payload["exp"] - time.time())
+    username, fingerprint, expires_at = cached
+    if expires_at <= time.time():
         raise credentials_exception
-    
-    # In a real app, you would get the user from the database here
-    # For simplicity, we'll just return the username
-    if token_data.username != "admin":
+
+    user = _user_cache.get(username)
+    if user is None:
+        user = await run_in_threadpool(_load_user, username)
+    if user is None or user[1] != fingerprint:
         raise credentials_exception
-    return token_data
\ No newline at end of file
+    return user[0]
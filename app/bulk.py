@@ -0,0 +1,307 @@
+import csv
+import io
+import json
+import os
+import time
+from abc import ABC, abstractmethod
+from typing import AsyncIterator, Iterable, List
+
+from fastapi.concurrency import run_in_threadpool
+from pydantic import ValidationError
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from . import analytics, models, schemas, search
+from .response_cache import department_tag, response_cache, roster_tag
+from .database import insert_for
+
+BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "5000"))
+MAX_REPORTED_ERRORS = 1000
+
+
+# Streaming parsers: split the request body into lines without buffering it.
+# Lines stay bytes until RecordParser decodes them, so a bad byte only costs its line.
+async def iter_lines(chunks: AsyncIterator[bytes]):
+    pending = b""
+    async for chunk in chunks:
+        pending += chunk
+        lines = pending.split(b"\n")
+        pending = lines.pop()
+        for line in lines:
+            yield line.rstrip(b"\r")
+    if pending:
+        yield pending.rstrip(b"\r")
+
+
+class RecordParser:
+    """Turns numbered lines into (line number, record, error); None for blank lines and the CSV header."""
+
+    def __init__(self, format: str):
+        self.format = format
+        self.header = None
+
+    def parse(self, line_no: int, raw: bytes):
+        try:
+            # utf-8-sig drops a byte order mark at the start of the upload
+            line = raw.decode("utf-8-sig" if line_no == 1 else "utf-8")
+        except UnicodeDecodeError as exc:
+            return line_no, None, f"Invalid UTF-8: {exc.reason} at byte {exc.start}"
+        if not line.strip():
+            return None
+        if self.format == "ndjson":
+            try:
+                record = json.loads(line)
+            except ValueError as exc:
+                return line_no, None, f"Invalid JSON: {exc}"
+            if not isinstance(record, dict):
+                return line_no, None, "Expected a JSON object"
+            return line_no, record, None
+
+        values = next(csv.reader([line]))
+        if self.header is None:
+            self.header = [name.strip() for name in values]
+            return None
+        if len(values) != len(self.header):
+            return line_no, None, f"Expected {len(self.header)} columns, got {len(values)}"
+        return line_no, dict(zip(self.header, values)), None
+
+
+async def iter_records(chunks: AsyncIterator[bytes], format: str):
+    """Yield (line number, record, error) for every non-blank line."""
+    parser = RecordParser(format)
+    line_no = 0
+    async for line in iter_lines(chunks):
+        line_no += 1
+        parsed = parser.parse(line_no, line)
+        if parsed is not None:
+            yield parsed
+
+
+def iter_file_records(path: str, format: str):
+    """iter_records for an upload already spooled to disk."""
+    parser = RecordParser(format)
+    with open(path, "rb") as source:
+        for line_no, line in enumerate(source, start=1):
+            parsed = parser.parse(line_no, line.rstrip(b"\r\n"))
+            if parsed is not None:
+                yield parsed
+
+
+def _format_validation_error(exc: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}"
+        for error in exc.errors()
+    )
+
+
+def _copy_rows(db: Session, table, rows: List[dict]) -> List[dict]:
+    # COPY into a transaction-scoped staging table, then merge so that rows
+    # racing with concurrent writers are skipped instead of failing the batch
+    columns = ", ".join(rows[0])
+    staging = f"_import_{table.name}"
+    buffer = io.StringIO()
+    csv.writer(buffer, quoting=csv.QUOTE_NONNUMERIC).writerows(
+        list(row.values()) for row in rows
+    )
+    buffer.seek(0)
+
+    cursor = db.connection().connection.cursor()
+    try:
+        cursor.execute(
+            f"CREATE TEMP TABLE {staging} ON COMMIT DROP AS "
+            f"SELECT {columns} FROM {table.name} WITH NO DATA"
+        )
+        cursor.copy_expert(f"COPY {staging} ({columns}) FROM STDIN WITH (FORMAT csv)", buffer)
+        cursor.execute(
+            f"INSERT INTO {table.name} ({columns}) "
+            f"SELECT {columns} FROM {staging} ON CONFLICT DO NOTHING RETURNING {columns}"
+        )
+        return [dict(zip(rows[0], values)) for values in cursor.fetchall()]
+    finally:
+        cursor.close()
+
+
+def write_rows(db: Session, table, rows: List[dict]) -> List[dict]:
+    """Insert rows, skipping conflicts; returns the rows actually inserted."""
+    if not rows:
+        return []
+    if db.get_bind().dialect.name == "postgresql":
+        return _copy_rows(db, table, rows)
+    columns = [table.c[name] for name in rows[0]]
+    result = db.execute(insert_for(db)(table).on_conflict_do_nothing().returning(*columns), rows)
+    return [row._asdict() for row in result]
+
+
+class Importer(ABC):
+    schema = None
+    table = None
+    unique_key: tuple = ()
+
+    def __init__(self, db: Session, batch_size: int = BATCH_SIZE):
+        self.db = db
+        self.batch_size = batch_size
+        self.received = 0
+        self.inserted = 0
+        self.rejected = 0
+        self.errors: List[schemas.ImportRowError] = []
+        self._pending: List[tuple] = []
+        self._started = time.perf_counter()
+
+    def add(self, line: int, record: dict) -> bool:
+        """Queue a record; returns True once a full batch is ready to flush."""
+        self.received += 1
+        self._pending.append((line, record))
+        return len(self._pending) >= self.batch_size
+
+    def add_error(self, line: int, error: str):
+        self.received += 1
+        self.reject(line, error)
+
+    def reject(self, line: int, error: str):
+        self.rejected += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append(schemas.ImportRowError(line=line, error=error))
+
+    def flush(self):
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+        valid = []
+        for line, record in batch:
+            try:
+                valid.append((line, self.schema(**record)))
+            except ValidationError as exc:
+                self.reject(line, _format_validation_error(exc))
+        resolved = self.resolve(valid)
+        rows = write_rows(self.db, self.table, [row for _, row in resolved])
+        if len(rows) < len(resolved):
+            # ON CONFLICT skipped rows a concurrent writer inserted after resolve() looked
+            written = {self._key(row) for row in rows}
+            for line, row in resolved:
+                if self._key(row) not in written:
+                    self.reject(line, "Conflict with concurrent write")
+        self.written(rows)
+        self.db.commit()
+        self.inserted += len(rows)
+        if rows:
+            self.committed(rows)
+
+    @abstractmethod
+    def resolve(self, valid: List[tuple]) -> List[tuple]:
+        """(line, row) pairs to insert, after rejecting the lines that cannot be."""
+
+    def _key(self, row: dict) -> tuple:
+        return tuple(row[name] for name in self.unique_key)
+
+    def written(self, rows: List[dict]):
+        """Hook for derived tables, run in the batch's transaction."""
+
+    def committed(self, rows: List[dict]):
+        """Hook for caches that core-level inserts bypass."""
+
+    def load(self, records: Iterable[dict]) -> schemas.ImportReport:
+        for line, record in enumerate(records, start=1):
+            if self.add(line, record):
+                self.flush()
+        self.flush()
+        return self.report()
+
+    def report(self) -> schemas.ImportReport:
+        elapsed = time.perf_counter() - self._started
+        return schemas.ImportReport(
+            received=self.received,
+            inserted=self.inserted,
+            rejected=self.rejected,
+            errors=self.errors,
+            elapsed_seconds=round(elapsed, 3),
+            rows_per_second=round(self.received / elapsed, 1) if elapsed else 0.0,
+        )
+
+
+class StudentImporter(Importer):
+    schema = schemas.StudentCreate
+    table = models.Student.__table__
+    unique_key = ("email",)
+
+    def resolve(self, valid: List[tuple]) -> List[tuple]:
+        # One query per batch for already-registered emails
+        emails = {item.email for _, item in valid}
+        seen = set(self.db.scalars(
+            select(models.Student.email).where(models.Student.email.in_(emails))
+        )) if emails else set()
+
+        rows = []
+        for line, item in valid:
+            if item.email in seen:
+                self.reject(line, "Email already registered")
+                continue
+            seen.add(item.email)
+            rows.append((line, item.dict()))
+        return rows
+
+    def committed(self, rows: List[dict]):
+        # COPY/INSERT skip the ORM events that keep the search index current
+        search.memory_index.invalidate()
+        response_cache.invalidate(*(department_tag(row["department"]) for row in rows))
+
+
+class EnrollmentImporter(Importer):
+    schema = schemas.EnrollmentCreate
+    table = models.Enrollment.__table__
+    unique_key = ("student_id", "course_id", "semester")
+
+    def resolve(self, valid: List[tuple]) -> List[tuple]:
+        if not valid:
+            return []
+        student_ids = {item.student_id for _, item in valid}
+        course_ids = {item.course_id for _, item in valid}
+        semesters = {item.semester for _, item in valid}
+
+        known_students = set(self.db.scalars(
+            select(models.Student.id).where(models.Student.id.in_(student_ids))
+        ))
+        known_courses = set(self.db.scalars(
+            select(models.Course.id).where(models.Course.id.in_(course_ids))
+        ))
+        seen = {tuple(row) for row in self.db.execute(
+            select(
+                models.Enrollment.student_id,
+                models.Enrollment.course_id,
+                models.Enrollment.semester,
+            ).where(
+                models.Enrollment.student_id.in_(student_ids),
+                models.Enrollment.course_id.in_(course_ids),
+                models.Enrollment.semester.in_(semesters),
+            )
+        )}
+
+        rows = []
+        for line, item in valid:
+            key = (item.student_id, item.course_id, item.semester)
+            if item.student_id not in known_students:
+                self.reject(line, "Student not found")
+            elif item.course_id not in known_courses:
+                self.reject(line, "Course not found")
+            elif key in seen:
+                self.reject(line, "Duplicate enrollment")
+            else:
+                seen.add(key)
+                rows.append((line, item.dict()))
+        return rows
+
+    def written(self, rows: List[dict]):
+        analytics.record_enrollments(self.db, rows)
+
+    def committed(self, rows: List[dict]):
+        response_cache.invalidate(*(roster_tag(row["course_id"]) for row in rows))
+
+
+async def consume(chunks: AsyncIterator[bytes], format: str, importer: Importer) -> schemas.ImportReport:
+    """Feed a streamed upload into an importer, flushing batches off the event loop."""
+    async for line, record, error in iter_records(chunks, format):
+        if error is not None:
+            importer.add_error(line, error)
+        elif importer.add(line, record):
+            await run_in_threadpool(importer.flush)
+    await run_in_threadpool(importer.flush)
+    return importer.report()
@@ -1,14 +1,72 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base # type: ignore
 from sqlalchemy.orm import sessionmaker
 import os
 from dotenv import load_dotenv
+from .instrumentation import instrument_engine
+from .pool import instrument_pool, pool_options
 
 load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL", "postgresql://postgres:postgres@db:5432/college_db")
 
-engine = create_engine(DATABASE_URL)
+_pool_options = pool_options(DATABASE_URL)
+engine = create_engine(DATABASE_URL, **_pool_options)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
-Base = declarative_base()
\ No newline at end of file
+Base = declarative_base()
+
+# SQLite only enforces foreign keys when asked to, per connection; the write
+# routes rely on them the same way as on PostgreSQL
+def enforce_foreign_keys(engine):
+    if engine.dialect.name != "sqlite":
+        return
+
+    @event.listens_for(engine, "connect")
+    def _enable(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.close()
+
+enforce_foreign_keys(engine)
+instrument_engine(engine)
+instrument_pool(engine, _pool_options)
+
+# Opt-in async engine (asyncpg / aiosqlite) used by app/async_routes.py
+ASYNC_DB = os.getenv("ASYNC_DB", "false").lower() in ("1", "true", "yes")
+ASYNC_DRIVERS = {"postgresql": "postgresql+asyncpg", "sqlite": "sqlite+aiosqlite"}
+
+def async_url(url):
+    url = make_url(url)
+    return url.set(drivername=ASYNC_DRIVERS[url.get_backend_name()])
+
+async_engine = None
+AsyncSessionLocal = None
+if ASYNC_DB:
+    _async_database_url = os.getenv("ASYNC_DATABASE_URL") or async_url(DATABASE_URL)
+    _async_pool_options = pool_options(_async_database_url, asynchronous=True)
+    async_engine = create_async_engine(_async_database_url, **_async_pool_options)
+    enforce_foreign_keys(async_engine.sync_engine)
+    instrument_engine(async_engine.sync_engine)
+    instrument_pool(async_engine.sync_engine, _async_pool_options)
+    AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, expire_on_commit=False)
+
+def get_db():
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+# Dialect-specific INSERT (supports ON CONFLICT) for the session's database
+def insert_for(db):
+    if db.get_bind().dialect.name == "postgresql":
+        return postgresql.insert
+    return sqlite.insert
@@ -0,0 +1,224 @@
+import logging
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter as Tally
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import event
+
+from .metrics import COUNT_BUCKETS, Counter, Histogram, render_gauges
+
+# Per-request cost accounting. The middleware opens a RequestStats in a
+# context variable; the engine hooks add to it from whichever thread or
+# greenlet runs the query, since both inherit the request's context.
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+PROFILE_REQUESTS = os.getenv("PROFILE_REQUESTS", "false").lower() in ("1", "true", "yes")
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+
+slow_query_log = logging.getLogger("app.slow_queries")
+profile_log = logging.getLogger("app.profiles")
+
+request_duration = Histogram("http_request_duration_seconds", "Request wall time.", ("method", "route"))
+request_db_duration = Histogram("http_request_db_seconds", "Time spent in queries per request.", ("method", "route"))
+request_queries = Histogram(
+    "http_request_queries", "Queries per request.", ("method", "route"), buckets=COUNT_BUCKETS
+)
+requests_total = Counter("http_requests_total", "Requests by status.", ("method", "route", "status"))
+request_rows = Counter("http_request_db_rows_total", "Rows the driver reported per route.", ("method", "route"))
+query_duration = Histogram("db_query_duration_seconds", "Duration of every query, in or out of a request.")
+slow_queries = Counter("db_slow_queries_total", "Queries slower than SLOW_QUERY_MS.", ("route",))
+
+UNMATCHED_ROUTE = "<unmatched>"
+_route_paths: Dict[object, str] = {}
+
+
+def route_of(scope) -> str:
+    """Route template for a routed scope (bounded label cardinality)."""
+    endpoint = scope.get("endpoint")
+    if endpoint is None:
+        return UNMATCHED_ROUTE
+    path = _route_paths.get(endpoint)
+    if path is None:
+        for route in scope["app"].routes:
+            if getattr(route, "endpoint", None) is endpoint:
+                path = _route_paths[endpoint] = route.path
+                break
+    return path or UNMATCHED_ROUTE
+
+
+class RequestStats:
+    __slots__ = ("scope", "started", "queries", "db_seconds", "rows", "threads")
+
+    def __init__(self, scope):
+        self.scope = scope
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.rows = 0
+        self.threads = {threading.get_ident()}
+
+    def record(self, seconds: float, rows: int):
+        self.queries += 1
+        self.db_seconds += seconds
+        self.rows += rows
+        self.threads.add(threading.get_ident())
+
+    def server_timing(self) -> str:
+        elapsed = (time.perf_counter() - self.started) * 1000
+        return f'app;dur={elapsed:.1f}, db;dur={self.db_seconds * 1000:.1f};desc="{self.queries} queries"'
+
+
+current_stats: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+def instrument_engine(engine):
+    """Time every cursor execution on `engine` (a sync Engine or an async engine's sync_engine)."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        seconds = time.perf_counter() - conn.info["query_started"].pop()
+        query_duration.observe((), seconds)
+        stats = current_stats.get()
+        if stats is not None:
+            # SQLite reports -1 for SELECTs; PostgreSQL drivers give the row count
+            stats.record(seconds, max(cursor.rowcount, 0))
+        if seconds * 1000 >= SLOW_QUERY_MS:
+            route = route_of(stats.scope) if stats is not None else "-"
+            slow_queries.inc((route,))
+            slow_query_log.warning("%.1f ms on %s: %s", seconds * 1000, route, " ".join(statement.split()))
+
+
+class StackSampler:
+    """Samples the stacks of one request's threads into collapsed-stack counts.
+
+    The output is the folded format read by flamegraph.pl and speedscope. On
+    the event loop thread, samples include whatever else the loop was running.
+    """
+
+    def __init__(self, stats: RequestStats, interval: float):
+        self.stats = stats
+        self.interval = interval
+        self.samples = Tally()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            for ident in list(self.stats.threads):
+                frame = frames.get(ident)
+                if frame is not None:
+                    self.samples[_collapse(frame)] += 1
+
+    def stop(self, path: str):
+        self._stop.set()
+        self._thread.join()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w") as out:
+            for stack, count in self.samples.most_common():
+                out.write(f"{stack} {count}\n")
+
+
+def _collapse(frame) -> str:
+    stack = []
+    while frame is not None:
+        code = frame.f_code
+        stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+        frame = frame.f_back
+    return ";".join(reversed(stack))
+
+
+def _should_profile(scope) -> bool:
+    if not PROFILE_REQUESTS:
+        return False
+    if (b"x-profile", b"1") in scope.get("headers", ()):
+        return True
+    return PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+
+
+class InstrumentationMiddleware:
+    """Records per-route metrics and adds a Server-Timing header.
+
+    With PROFILE_REQUESTS on, requests sent with `X-Profile: 1` (plus a random
+    PROFILE_SAMPLE_RATE share of the rest) are sampled into PROFILE_DIR; the
+    file name comes back in the X-Profile-Id header.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats(scope)
+        token = current_stats.set(stats)
+        sampler = profile_id = None
+        if _should_profile(scope):
+            profile_id = f"{time.strftime('%Y%m%dT%H%M%S')}-{random.getrandbits(32):08x}.folded"
+            sampler = StackSampler(stats, PROFILE_INTERVAL_MS / 1000)
+            sampler.start()
+        status_code = 500
+
+        async def send_with_timing(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", stats.server_timing().encode()))
+                if profile_id:
+                    headers.append((b"x-profile-id", profile_id.encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            current_stats.reset(token)
+            elapsed = time.perf_counter() - stats.started
+            method, route = scope["method"], route_of(scope)
+            request_duration.observe((method, route), elapsed)
+            request_db_duration.observe((method, route), stats.db_seconds)
+            request_queries.observe((method, route), stats.queries)
+            request_rows.inc((method, route), stats.rows)
+            requests_total.inc((method, route, str(status_code)))
+            if sampler is not None:
+                path = os.path.join(PROFILE_DIR, profile_id)
+                sampler.stop(path)
+                profile_log.info(
+                    "%s %s: %d samples, %d queries, %.1f ms -> %s",
+                    method, route, sum(sampler.samples.values()), stats.queries, elapsed * 1000, path,
+                )
+
+
+def render(gauges: Dict[str, List[Tuple[Dict[str, str], dict]]]) -> str:
+    """Prometheus text for the request metrics plus snapshot gauges.
+
+    `gauges` maps a metric prefix to (labels, snapshot) pairs, e.g. the pool,
+    response cache and login snapshots served under /metrics/*.
+    """
+    lines = []
+    for metric in (requests_total, request_duration, request_db_duration, request_queries, request_rows,
+                   query_duration, slow_queries):
+        lines += metric.render()
+    gauge_lines = []
+    for prefix, snapshots in gauges.items():
+        for labels, snapshot in snapshots:
+            gauge_lines += render_gauges(prefix, snapshot, labels)
+    # Samples of one metric must be contiguous
+    lines += sorted(gauge_lines)
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,565 @@
+import csv
+import itertools
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import AsyncIterator, Callable, Dict, List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Path, Query, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse
+from sqlalchemy import and_, create_engine, distinct, func, select, tuple_, update
+from sqlalchemy.orm import Session, sessionmaker
+
+from . import analytics, bulk, database, models, schemas, writes
+from .auth import get_current_user
+from .database import DATABASE_URL, enforce_foreign_keys, get_db
+from .instrumentation import instrument_engine
+from .pagination import cursor_position, set_next_cursor
+from .pool import instrument_pool, job_pool_options, pool_status
+from .response_cache import response_cache, roster_tag
+
+# In-process background jobs. The jobs table is the queue: any API process
+# can submit, and worker threads in every process claim queued rows. Handlers
+# work in chunks and commit a checkpoint with each chunk's writes, so a job
+# interrupted by a restart is re-queued and carries on from its last chunk.
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_POLL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", "1"))
+JOB_STALE_SECONDS = float(os.getenv("JOB_STALE_SECONDS", "120"))
+JOB_CHUNK_SIZE = int(os.getenv("JOB_CHUNK_SIZE", "5000"))
+JOB_SPOOL_DIR = os.getenv("JOB_SPOOL_DIR", "job_spool")
+
+QUEUED, RUNNING, SUCCEEDED, FAILED, CANCELLED = "queued", "running", "succeeded", "failed", "cancelled"
+FINISHED = (SUCCEEDED, FAILED, CANCELLED)
+
+JOBS = models.Job.__table__
+log = logging.getLogger("app.jobs")
+router = APIRouter(prefix="/jobs", tags=["jobs"])
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class JobInterrupted(Exception):
+    """The runner is shutting down; the job goes back to the queue."""
+
+
+class JobLost(Exception):
+    """The job was re-queued and claimed again elsewhere; this run must stop writing."""
+
+
+class JobContext:
+    """What a handler sees of its job: parameters, last checkpoint and a session."""
+
+    def __init__(self, db: Session, job: models.Job, stopping: threading.Event):
+        self.db = db
+        self.id = job.id
+        self.claim = job.worker
+        self.kind = job.kind
+        self.params = job.params or {}
+        self.checkpoint = job.checkpoint or {}
+        self.cancel_requested = job.cancel_requested
+        self._stopping = stopping
+
+    def save(self, checkpoint: dict, progress: int, total: Optional[int] = None):
+        """Record progress in the open transaction, so it commits with the chunk it describes."""
+        values = {"checkpoint": checkpoint, "progress": progress, "heartbeat_at": datetime.utcnow()}
+        if total is not None:
+            values["total"] = total
+        # Fenced on this run's claim: a run whose job was taken over writes nothing more
+        cancel_requested = self.db.execute(
+            update(JOBS).where(JOBS.c.id == self.id, JOBS.c.worker == self.claim, JOBS.c.status == RUNNING)
+            .values(**values).returning(JOBS.c.cancel_requested)
+        ).scalar_one_or_none()
+        if cancel_requested is None:
+            raise JobLost()
+        self.cancel_requested = cancel_requested
+        self.checkpoint = checkpoint
+
+    def check(self):
+        """Between chunks: stop here if the job was cancelled or the runner is stopping."""
+        if self.cancel_requested:
+            raise JobCancelled()
+        if self._stopping.is_set():
+            raise JobInterrupted()
+
+
+def spool_path(name: str) -> str:
+    os.makedirs(JOB_SPOOL_DIR, exist_ok=True)
+    return os.path.join(JOB_SPOOL_DIR, name)
+
+
+# Handlers: run in a worker thread with the job's own session; return the result
+class _CheckpointedImport:
+    """Commits the job checkpoint with each import batch."""
+
+    ctx: JobContext
+    position = 0
+
+    def written(self, rows: List[dict]):
+        super().written(rows)
+        # inserted only counts this batch once it commits
+        self.ctx.save({
+            "line": self.position,
+            "received": self.received,
+            "inserted": self.inserted + len(rows),
+            "rejected": self.rejected,
+            "errors": [error.dict() for error in self.errors],
+        }, self.position)
+
+    def restore(self, checkpoint: dict):
+        self.received = checkpoint.get("received", 0)
+        self.inserted = checkpoint.get("inserted", 0)
+        self.rejected = checkpoint.get("rejected", 0)
+        self.errors = [schemas.ImportRowError(**error) for error in checkpoint.get("errors", [])]
+
+
+class StudentImportJob(_CheckpointedImport, bulk.StudentImporter):
+    pass
+
+
+class EnrollmentImportJob(_CheckpointedImport, bulk.EnrollmentImporter):
+    pass
+
+
+IMPORTERS = {"import_students": StudentImportJob, "import_enrollments": EnrollmentImportJob}
+
+
+def run_import(ctx: JobContext) -> dict:
+    importer = IMPORTERS[ctx.kind](ctx.db)
+    importer.ctx = ctx
+    importer.restore(ctx.checkpoint)
+    done = ctx.checkpoint.get("line", 0)
+    for line, record, error in bulk.iter_file_records(ctx.params["upload"], ctx.params["format"]):
+        if line <= done:
+            continue
+        importer.position = line
+        if error is not None:
+            importer.add_error(line, error)
+        elif importer.add(line, record):
+            importer.flush()
+            ctx.check()
+    importer.flush()
+    return importer.report().dict()
+
+
+def run_report(ctx: JobContext) -> dict:
+    params = ctx.params
+    report = analytics.REPORTS[params["report"]]
+    stmt = report.query(**{
+        name: params[name] for name in schemas.REPORT_FILTERS[params["report"]] if params.get(name) is not None
+    })
+    path = spool_path(f"report-{ctx.id}.csv")
+    checkpoint = ctx.checkpoint
+    total = checkpoint.get("total")
+    if total is None:
+        total = ctx.db.scalar(select(func.count()).select_from(stmt.order_by(None).subquery()))
+    after, written = checkpoint.get("after"), checkpoint.get("rows", 0)
+
+    if checkpoint:
+        # Drop anything written after the last committed chunk
+        os.truncate(path, checkpoint["offset"])
+    with open(path, "a" if checkpoint else "w", newline="", encoding="utf-8") as out:
+        writer = csv.writer(out)
+        if not checkpoint:
+            writer.writerow(list(report.schema.__fields__))
+        while True:
+            page = stmt if after is None else stmt.where(tuple_(*report.keys) > tuple(after))
+            rows = ctx.db.execute(page.limit(JOB_CHUNK_SIZE)).all()
+            if not rows:
+                break
+            writer.writerows(rows)
+            out.flush()
+            os.fsync(out.fileno())
+            after = [getattr(rows[-1], key.name) for key in report.keys]
+            written += len(rows)
+            ctx.save({"offset": out.tell(), "after": after, "rows": written, "total": total}, written, total)
+            ctx.db.commit()
+            ctx.check()
+    return {"rows": written, "file": path}
+
+
+def run_rollover(ctx: JobContext) -> dict:
+    params, checkpoint = ctx.params, ctx.checkpoint
+    enrollment = models.Enrollment
+    students = select(enrollment.student_id).where(enrollment.semester == params["from_semester"])
+    if params.get("course_ids"):
+        students = students.where(enrollment.course_id.in_(params["course_ids"]))
+    total = checkpoint.get("total")
+    if total is None:
+        total = ctx.db.scalar(students.with_only_columns(func.count(distinct(enrollment.student_id))))
+    after, moved, created = checkpoint.get("after", 0), checkpoint.get("students", 0), checkpoint.get("created", 0)
+
+    while True:
+        # Chunks are student id ranges; ON CONFLICT makes a replayed chunk a no-op
+        ids = ctx.db.scalars(
+            students.where(enrollment.student_id > after).distinct()
+            .order_by(enrollment.student_id).limit(JOB_CHUNK_SIZE)
+        ).all()
+        if not ids:
+            break
+        rows = [row._mapping for row in ctx.db.execute(writes.copy_enrollments(
+            ctx.db, params["from_semester"], params["to_semester"], ids[0], ids[-1], params.get("course_ids"),
+        ))]
+        analytics.record_enrollments(ctx.db, rows)
+        after, moved, created = ids[-1], moved + len(ids), created + len(rows)
+        ctx.save({"after": after, "students": moved, "created": created, "total": total}, moved, total)
+        ctx.db.commit()
+        response_cache.invalidate(*(roster_tag(row["course_id"]) for row in rows))
+        ctx.check()
+    return {"students": moved, "enrollments_created": created}
+
+
+HANDLERS: Dict[str, Callable[[JobContext], dict]] = {
+    "import_students": run_import,
+    "import_enrollments": run_import,
+    "report": run_report,
+    "rollover": run_rollover,
+}
+
+
+def _remove_upload(params: dict):
+    upload = (params or {}).get("upload")
+    if upload and os.path.exists(upload):
+        os.remove(upload)
+
+
+class JobRunner:
+    """Worker threads that claim and run queued jobs.
+
+    Workers get their own fixed pool with one connection each, plus one for
+    the heartbeat thread, so the API pool is left alone. Each claim writes a
+    distinct `worker` value (process id plus a claim number) that the job's
+    later writes are fenced on.
+    """
+
+    def __init__(self, workers: int = JOB_WORKERS):
+        self.workers = workers
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self.engine = None
+        self.running: Dict[int, str] = {}
+        self._threads: List[threading.Thread] = []
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._next_sweep = 0.0
+        self._recovered = False
+        self._recover_lock = threading.Lock()
+        self._claims = itertools.count(1)
+
+    def start(self):
+        """Start the worker threads; the database is first used from those threads."""
+        if self.workers <= 0 or self._threads:
+            return
+        options = job_pool_options(DATABASE_URL, self.workers + 1)
+        if options:
+            self.engine = create_engine(DATABASE_URL, **options)
+            enforce_foreign_keys(self.engine)
+            instrument_engine(self.engine)
+            instrument_pool(self.engine, options)
+        else:
+            # An in-memory SQLite database only exists on the API engine
+            self.engine = database.engine
+        self.Session = sessionmaker(bind=self.engine, autoflush=False)
+        self._stopping.clear()
+        self._recovered = False
+        for number in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"job-worker-{number}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        thread = threading.Thread(target=self._heartbeat, name="job-heartbeat", daemon=True)
+        thread.start()
+        self._threads.append(thread)
+
+    def stop(self, timeout: float = 30):
+        """Running jobs stop after their current chunk and return to the queue."""
+        self._stopping.set()
+        self._wake.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+        if self.engine is not None and self.engine is not database.engine:
+            self.engine.dispose()
+        self.engine = None
+
+    def notify(self):
+        self._wake.set()
+
+    def pool_statuses(self) -> dict:
+        if self.engine is None or self.engine is database.engine:
+            return {}
+        stats = pool_status(self.engine)
+        return {"jobs": stats} if stats is not None else {}
+
+    def _ours(self):
+        return JOBS.c.worker.startswith(f"{self.worker_id}/", autoescape=True)
+
+    def _requeue(self, db: Session, condition):
+        count = db.execute(
+            update(JOBS).where(JOBS.c.status == RUNNING, condition).values(status=QUEUED, worker=None)
+        ).rowcount
+        if count:
+            log.warning("Re-queued %d interrupted job(s)", count)
+
+    def _recover(self):
+        """Once per start, before the first claim: nothing of ours can be running yet."""
+        with self._recover_lock:
+            if self._recovered:
+                return
+            with self.Session() as db:
+                # These were cut off by a restart
+                self._requeue(db, self._ours())
+                db.commit()
+            self._recovered = True
+
+    def _heartbeat(self):
+        # Independent of chunk progress, so a slow chunk or count query never looks stale
+        while not self._stopping.wait(JOB_STALE_SECONDS / 4):
+            job_ids = list(self.running)
+            if not job_ids:
+                continue
+            try:
+                with self.Session() as db:
+                    db.execute(update(JOBS).where(
+                        JOBS.c.id.in_(job_ids), JOBS.c.status == RUNNING, self._ours()
+                    ).values(heartbeat_at=datetime.utcnow()))
+                    db.commit()
+            except Exception:
+                log.exception("Job heartbeat failed")
+
+    def _work(self):
+        while not self._stopping.is_set():
+            try:
+                self._recover()
+                job_id = self._claim()
+            except Exception:
+                # e.g. the database is not reachable yet; retried on the next pass
+                log.exception("Claiming a job failed")
+                job_id = None
+            if job_id is None:
+                self._wake.wait(JOB_POLL_SECONDS)
+                self._wake.clear()
+                continue
+            self._run(job_id)
+
+    def _claim(self) -> Optional[int]:
+        with self.Session() as db:
+            if time.monotonic() >= self._next_sweep:
+                # Jobs of a process that died without stopping its runner
+                self._next_sweep = time.monotonic() + JOB_STALE_SECONDS / 2
+                stale = datetime.utcnow() - timedelta(seconds=JOB_STALE_SECONDS)
+                self._requeue(db, JOBS.c.heartbeat_at < stale)
+            job_id = db.scalar(
+                select(JOBS.c.id).where(JOBS.c.status == QUEUED).order_by(JOBS.c.id).limit(1)
+                .with_for_update(skip_locked=True)
+            )
+            if job_id is not None:
+                now = datetime.utcnow()
+                # The status check decides races where there are no row locks (SQLite)
+                claimed = db.execute(
+                    update(JOBS).where(JOBS.c.id == job_id, JOBS.c.status == QUEUED).values(
+                        status=RUNNING, worker=f"{self.worker_id}/{next(self._claims)}", heartbeat_at=now,
+                        started_at=func.coalesce(JOBS.c.started_at, now),
+                    )
+                ).rowcount
+                if not claimed:
+                    job_id = None
+            db.commit()
+            return job_id
+
+    def _run(self, job_id: int):
+        self.running[job_id] = threading.current_thread().name
+        try:
+            with self.Session() as db:
+                ctx = JobContext(db, db.get(models.Job, job_id), self._stopping)
+                started = time.perf_counter()
+                result = error = None
+                try:
+                    result = HANDLERS[ctx.kind](ctx)
+                    outcome = SUCCEEDED
+                except JobInterrupted:
+                    db.rollback()
+                    self._requeue(db, and_(JOBS.c.id == job_id, JOBS.c.worker == ctx.claim))
+                    db.commit()
+                    return
+                except JobLost:
+                    db.rollback()
+                    log.warning("Job %d was taken over by another worker; abandoning this run", job_id)
+                    return
+                except JobCancelled:
+                    db.rollback()
+                    outcome = CANCELLED
+                except Exception as exc:
+                    db.rollback()
+                    log.exception("Job %d (%s) failed", job_id, ctx.kind)
+                    outcome, error = FAILED, f"{type(exc).__name__}: {exc}"
+                finished = db.execute(update(JOBS).where(JOBS.c.id == job_id, JOBS.c.worker == ctx.claim).values(
+                    status=outcome, result=result, error=error, finished_at=datetime.utcnow(),
+                )).rowcount
+                db.commit()
+                if not finished:
+                    log.warning("Job %d was taken over before it finished; result discarded", job_id)
+                    return
+                _remove_upload(ctx.params)
+                log.info("Job %d (%s) %s in %.1f s", job_id, ctx.kind, outcome, time.perf_counter() - started)
+        finally:
+            self.running.pop(job_id, None)
+
+
+runner = JobRunner()
+
+
+def snapshot(db: Session) -> dict:
+    counts = dict(db.execute(select(JOBS.c.status, func.count()).group_by(JOBS.c.status)).all())
+    return {
+        "workers": runner.workers,
+        "running_here": len(runner.running),
+        **{state: counts.get(state, 0) for state in (QUEUED, RUNNING, SUCCEEDED, FAILED, CANCELLED)},
+    }
+
+
+def _submit(db: Session, kind: str, params: dict, user: schemas.TokenData, total: Optional[int] = None):
+    job = models.Job(kind=kind, params=params, total=total, submitted_by=user.username)
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    runner.notify()
+    return job
+
+
+def _get_job(db: Session, job_id: int) -> models.Job:
+    job = db.get(models.Job, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+async def _spool(chunks: AsyncIterator[bytes], path: str) -> int:
+    """Write an upload to disk; returns its line count for progress reporting."""
+    lines, last = 0, b"\n"
+    with open(path, "wb") as out:
+        async for chunk in chunks:
+            if chunk:
+                await run_in_threadpool(out.write, chunk)
+                lines += chunk.count(b"\n")
+                last = chunk[-1:]
+    return lines + (last != b"\n")
+
+
+@router.post("/imports/{target}", response_model=schemas.Job, status_code=status.HTTP_202_ACCEPTED)
+async def submit_import(
+    request: Request,
+    target: str = Path(..., regex="^(students|enrollments)$"),
+    format: str = Query("csv", regex="^(csv|ndjson)$"),
+    db: Session = Depends(get_db),
+    current_user: schemas.TokenData = Depends(get_current_user)
+):
+    """Queue a bulk import; the body is spooled to JOB_SPOOL_DIR first."""
+    path = spool_path(f"upload-{uuid.uuid4().hex}.{format}")
+    try:
+        lines = await _spool(request.stream(), path)
+    except BaseException:
+        _remove_upload({"upload": path})
+        raise
+    return await run_in_threadpool(
+        _submit, db, f"import_{target}", {"upload": path, "format": format}, current_user, lines
+    )
+
+
+@router.post("/reports", response_model=schemas.Job, status_code=status.HTTP_202_ACCEPTED)
+def submit_report(
+    report: schemas.ReportJobCreate,
+    db: Session = Depends(get_db),
+    current_user: schemas.TokenData = Depends(get_current_user)
+):
+    """Queue a CSV export of an /analytics report; download it from /jobs/{id}/result."""
+    return _submit(db, "report", report.dict(), current_user)
+
+
+@router.post("/rollovers", response_model=schemas.Job, status_code=status.HTTP_202_ACCEPTED)
+def submit_rollover(
+    rollover: schemas.RolloverJobCreate,
+    db: Session = Depends(get_db),
+    current_user: schemas.TokenData = Depends(get_current_user)
+):
+    """Queue re-enrollment of one semester's enrollments into another."""
+    if rollover.from_semester == rollover.to_semester:
+        raise HTTPException(status_code=400, detail="from_semester and to_semester must differ")
+    return _submit(db, "rollover", rollover.dict(), current_user)
+
+
+@router.get("/", response_model=List[schemas.Job])
+def list_jobs(
+    response: Response,
+    status_filter: Optional[str] = Query(None, alias="status"),
+    kind: Optional[str] = Query(None),
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = Query(None, description="Cursor from the X-Next-Cursor header"),
+    db: Session = Depends(get_db),
+    current_user: schemas.TokenData = Depends(get_current_user)
+):
+    """Most recent jobs first."""
+    stmt = select(models.Job).order_by(models.Job.id.desc()).limit(limit)
+    if status_filter:
+        stmt = stmt.where(models.Job.status == status_filter)
+    if kind:
+        stmt = stmt.where(models.Job.kind == kind)
+    before = cursor_position(cursor, status=status_filter, kind=kind)
+    if before is not None:
+        stmt = stmt.where(models.Job.id < before)
+    jobs = db.scalars(stmt).all()
+    set_next_cursor(response, jobs, limit, lambda job: {"status": status_filter, "kind": kind, "id": job.id})
+    return jobs
+
+
+@router.get("/{job_id}", response_model=schemas.Job)
+def get_job(
+    job_id: int,
+    db: Session = Depends(get_db),
+    current_user: schemas.TokenData = Depends(get_current_user)
+):
+    return _get_job(db, job_id)
+
+
+@router.get("/{job_id}/result")
+def get_job_result(
+    job_id: int,
+    db: Session = Depends(get_db),
+    current_user: schemas.TokenData = Depends(get_current_user)
+):
+    """The job's result: JSON, or the CSV file for report jobs."""
+    job = _get_job(db, job_id)
+    if job.status != SUCCEEDED:
+        raise HTTPException(status_code=409, detail=f"Job is {job.status}")
+    if job.kind == "report":
+        return FileResponse(
+            job.result["file"], media_type="text/csv", filename=f"{job.params['report']}-{job.id}.csv"
+        )
+    return job.result
+
+
+@router.post("/{job_id}/cancel", response_model=schemas.Job, status_code=status.HTTP_202_ACCEPTED)
+def cancel_job(
+    job_id: int,
+    db: Session = Depends(get_db),
+    current_user: schemas.TokenData = Depends(get_current_user)
+):
+    """Queued jobs are cancelled at once; running ones stop after their current chunk."""
+    job = _get_job(db, job_id)
+    if job.status in FINISHED:
+        raise HTTPException(status_code=409, detail=f"Job already {job.status}")
+    dequeued = db.execute(
+        update(JOBS).where(JOBS.c.id == job_id, JOBS.c.status == QUEUED)
+        .values(status=CANCELLED, cancel_requested=True, finished_at=datetime.utcnow())
+    ).rowcount
+    if not dequeued:
+        db.execute(update(JOBS).where(JOBS.c.id == job_id, JOBS.c.status == RUNNING).values(cancel_requested=True))
+    db.commit()
+    db.refresh(job)
+    if dequeued:
+        _remove_upload(job.params)
+    return job
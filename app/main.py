@@ -1,127 +1,229 @@
-from fastapi import FastAPI, Depends, HTTPException, status, Query, Response
-from . import models, schemas
-from .database import engine, SessionLocal
+from fastapi import APIRouter, FastAPI, Depends, HTTPException, status, Query, Request, Response
+from . import analytics, async_routes, bulk, database, instrumentation, jobs, models, schemas, search, writes
+from .database import engine, get_db
 from sqlalchemy.orm import Session
-from .auth import get_current_user, create_access_token, get_password_hash, verify_password
+from .auth import (
+    get_current_user, create_access_token, aget_password_hash, averify_password,
+    cache_user, client_address, enforce_login_rate, invalidate_user, login_metrics, password_fingerprint,
+    record_login_failure
+)
+from fastapi.concurrency import run_in_threadpool
+from contextlib import asynccontextmanager
 from datetime import timedelta
 from fastapi.security import OAuth2PasswordRequestForm, OAuth2PasswordBearer
 from typing import List, Optional
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse, PlainTextResponse, StreamingResponse
+from .pagination import cursor_position, iter_ndjson, next_cursor, next_cursor_headers
+from .response_cache import department_tag, encode, response_cache, roster_tag, student_tag
+from .serialization import encode_rows, json_response
+from sqlalchemy import and_, distinct, func, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload
+from .pool import pool_status
 
-# Database tables creation
-models.Base.metadata.create_all(bind=engine)
+# Schema changes are not made here: `alembic upgrade head` runs once per
+# deploy (see migrations/), so importing the app or starting a worker never
+# needs the database. Connections open on first use.
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Background job workers (app/jobs.py) live as long as the server process
+    await run_in_threadpool(jobs.runner.start)
+    yield
+    await run_in_threadpool(jobs.runner.stop)
+    engine.dispose()
+    if database.async_engine is not None:
+        await database.async_engine.dispose()
 
-# Initialize FastAPI app
-app = FastAPI(
-    title="College Management System API",
-    description="API for managing students, courses, and enrollments",
-    version="1.0.0"
-)
+# Routes mounted in both modes
+shared_router = APIRouter()
 
-# CORS Middleware
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-# Dependency
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+# Routes with async twins in app/async_routes.py; ASYNC_DB selects which set is mounted
+router = APIRouter()
 
 # Authentication endpoints
-@app.post("/token", response_model=schemas.Token)
+@shared_router.post("/token", response_model=schemas.Token)
 async def login_for_access_token(
+    request: Request,
     form_data: OAuth2PasswordRequestForm = Depends(),
     db: Session = Depends(get_db)
 ):
-    user = db.query(models.User).filter(
-        models.User.username == form_data.username
-    ).first()
+    client_ip = client_address(request)
+    enforce_login_rate(form_data.username, client_ip)
+    # Lookup and bcrypt both run off the event loop
+    user = await run_in_threadpool(
+        lambda: db.query(models.User).filter(models.User.username == form_data.username).first()
+    )
     
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    if not user or not await averify_password(form_data.password, user.hashed_password):
+        record_login_failure(form_data.username, client_ip)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password"
         )
     
+    cache_user(user)
     access_token_expires = timedelta(minutes=30)
     access_token = create_access_token(
-        data={"sub": user.username},
+        data={"sub": user.username, "pv": password_fingerprint(user.hashed_password)},
         expires_delta=access_token_expires
     )
     return {"access_token": access_token, "token_type": "bearer"}
 
+@shared_router.put("/users/me/password", status_code=status.HTTP_204_NO_CONTENT)
+async def change_password(
+    request: Request,
+    passwords: schemas.PasswordChange,
+    db: Session = Depends(get_db),
+    current_user: schemas.TokenData = Depends(get_current_user)
+):
+    # Same limits and bounded bcrypt pool as /token
+    client_ip = client_address(request)
+    enforce_login_rate(current_user.username, client_ip)
+    user = await run_in_threadpool(
+        lambda: db.query(models.User).filter(models.User.username == current_user.username).first()
+    )
+    if not user or not await averify_password(passwords.current_password, user.hashed_password):
+        record_login_failure(current_user.username, client_ip)
+        raise HTTPException(status_code=400, detail="Incorrect password")
+
+    user.hashed_password = await aget_password_hash(passwords.new_password)
+    await run_in_threadpool(db.commit)
+    # Tokens carry a fingerprint of the old hash; drop cached copies now
+    invalidate_user(user.username)
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
 # Student endpoints
-@app.post("/students/", response_model=schemas.Student, status_code=status.HTTP_201_CREATED)
+@router.post("/students/", response_model=schemas.Student, status_code=status.HTTP_201_CREATED)
 def create_student(
     student: schemas.StudentCreate, 
     db: Session = Depends(get_db),
     current_user: schemas.TokenData = Depends(get_current_user)
 ):
-    # Check if email already exists
-    db_student = db.query(models.Student).filter(
-        models.Student.email == student.email
-    ).first()
-    if db_student:
+    # The unique email index rejects duplicates; nothing comes back on conflict
+    db_student = db.execute(writes.insert_student(db, student.dict())).first()
+    if db_student is None:
         raise HTTPException(status_code=400, detail="Email already registered")
-    
-    db_student = models.Student(**student.dict())
-    db.add(db_student)
     db.commit()
-    db.refresh(db_student)
+    search.index_student(db_student)
+    response_cache.invalidate(department_tag(db_student.department))
     return db_student
 
-@app.get("/students/", response_model=List[schemas.Student])
+@shared_router.post("/students/import", response_model=schemas.ImportReport)
+async def import_students(
+    request: Request,
+    format: str = Query("csv", regex="^(csv|ndjson)$"),
+    db: Session = Depends(get_db),
+    current_user: schemas.TokenData = Depends(get_current_user)
+):
+    # Streams the upload; see app/bulk.py for batching and the COPY path
+    return await bulk.consume(request.stream(), format, bulk.StudentImporter(db))
+
+@router.get("/students/", response_model=List[schemas.Student])
 def read_students(
+    request: Request,
     skip: int = 0, 
     limit: int = 100,
     department: Optional[str] = Query(None),
+    cursor: Optional[str] = Query(None, description="Keyset cursor from the X-Next-Cursor header"),
+    format: str = Query("json", regex="^(json|ndjson)$"),
     db: Session = Depends(get_db),
     current_user: schemas.TokenData = Depends(get_current_user)
 ):
-    query = db.query(models.Student)
+    # Column tuples, not Student objects: pages are encoded straight from the rows
+    query = db.query(*models.STUDENT_COLUMNS)
     if department:
         query = query.filter(models.Student.department == department)
+
+    # Keyset seek on (department, id) / (id) instead of scanning past an offset
+    after_id = cursor_position(cursor, department=department)
+    if after_id is not None:
+        query = query.filter(models.Student.id > after_id)
+        skip = 0
+    query = query.order_by(models.Student.id)
+
+    if format == "ndjson":
+        # Rest of the (filtered) table from a server-side cursor; skip and cursor apply, limit does not
+        rows = query.offset(skip).yield_per(1000)
+        return StreamingResponse(iter_ndjson(rows, models.STUDENT_FIELDS), media_type="application/x-ndjson")
+
+    if not department:
+        students = query.offset(skip).limit(limit).all()
+        return json_response(
+            encode_rows(students, models.STUDENT_FIELDS, schemas.Student),
+            next_cursor_headers(students, limit, lambda s: {"department": department, "id": s.id}),
+        )
+
+    # Department pages are cached until a student in that department changes
+    cache_key, cached = response_cache.lookup(
+        request, f"students:{department}:{skip}:{limit}:{after_id}", [department_tag(department)]
+    )
+    if cached:
+        return cached
     students = query.offset(skip).limit(limit).all()
-    return students
+    return response_cache.store(
+        request, cache_key,
+        encode_rows(students, models.STUDENT_FIELDS, schemas.Student),
+        next_cursor_headers(students, limit, lambda s: {"department": department, "id": s.id}),
+    )
 
-@app.get("/students/{student_id}", response_model=schemas.Student)
+@router.get("/students/{student_id}", response_model=schemas.Student)
 def read_student(
     student_id: int,
+    request: Request,
     db: Session = Depends(get_db),
     current_user: schemas.TokenData = Depends(get_current_user)
 ):
+    cache_key, cached = response_cache.lookup(request, f"student:{student_id}", [student_tag(student_id)])
+    if cached:
+        return cached
     student = db.query(models.Student).filter(models.Student.id == student_id).first()
     if not student:
         raise HTTPException(status_code=404, detail="Student not found")
-    return student
+    return response_cache.store(request, cache_key, encode(schemas.Student.from_orm(student)))
+
+def _student_cache_tags(db: Session, student_id: int) -> Optional[List[str]]:
+    """Tags of every cached response showing the student, or None if there is no such student."""
+    # Rosters embed the student too, so include every course they are enrolled in
+    rows = db.execute(
+        select(models.Student.department, models.Enrollment.course_id)
+        .outerjoin(models.Enrollment, models.Enrollment.student_id == models.Student.id)
+        .where(models.Student.id == student_id)
+        .distinct()
+    ).all()
+    if not rows:
+        return None
+    return [
+        student_tag(student_id),
+        department_tag(rows[0].department),
+        *(roster_tag(row.course_id) for row in rows if row.course_id is not None),
+    ]
 
-@app.put("/students/{student_id}", response_model=schemas.Student)
+@router.put("/students/{student_id}", response_model=schemas.Student)
 def update_student(
     student_id: int,
     student: schemas.StudentCreate,
     db: Session = Depends(get_db),
     current_user: schemas.TokenData = Depends(get_current_user)
 ):
-    db_student = db.query(models.Student).filter(models.Student.id == student_id).first()
-    if not db_student:
+    cache_tags = _student_cache_tags(db, student_id)
+    if cache_tags is None:
         raise HTTPException(status_code=404, detail="Student not found")
-    
-    for field, value in student.dict().items():
-        setattr(db_student, field, value)
-    
-    db.commit()
-    db.refresh(db_student)
+
+    try:
+        db_student = db.execute(writes.update_student(student_id, student.dict())).first()
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=400, detail="Email already registered")
+    if db_student is None:
+        raise HTTPException(status_code=404, detail="Student not found")
+
+    search.index_student(db_student)
+    response_cache.invalidate(*cache_tags, department_tag(db_student.department))
     return db_student
 
-@app.delete("/students/{student_id}", status_code=status.HTTP_204_NO_CONTENT)
+@router.delete("/students/{student_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_student(
     student_id: int,
     db: Session = Depends(get_db),
@@ -131,74 +233,307 @@ def delete_student(
     if not student:
         raise HTTPException(status_code=404, detail="Student not found")
     
+    cache_tags = _student_cache_tags(db, student_id)
     db.delete(student)
-    db.commit()
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=400, detail="Student has enrollments")
+    response_cache.invalidate(*cache_tags)
     return Response(status_code=status.HTTP_204_NO_CONTENT)
 
 # Course endpoints (similar CRUD operations)
 # ... [include all your existing course endpoints] ...
 
 # Enhanced Enrollment endpoints
-@app.post("/enrollments/", response_model=schemas.Enrollment, status_code=status.HTTP_201_CREATED)
+@router.post("/enrollments/", response_model=schemas.Enrollment, status_code=status.HTTP_201_CREATED)
 def create_enrollment(
     enrollment: schemas.EnrollmentCreate, 
     db: Session = Depends(get_db),
     current_user: schemas.TokenData = Depends(get_current_user)
 ):
-    # Check if student exists
-    student = db.query(models.Student).filter(
-        models.Student.id == enrollment.student_id
-    ).first()
-    if not student:
-        raise HTTPException(status_code=404, detail="Student not found")
-    
-    # Check if course exists
-    course = db.query(models.Course).filter(
-        models.Course.id == enrollment.course_id
-    ).first()
-    if not course:
-        raise HTTPException(status_code=404, detail="Course not found")
-    
-    # Check for existing enrollment
-    existing = db.query(models.Enrollment).filter(
-        models.Enrollment.student_id == enrollment.student_id,
-        models.Enrollment.course_id == enrollment.course_id,
-        models.Enrollment.semester == enrollment.semester
-    ).first()
-    if existing:
+    # One round trip on success; the constraints replace the pre-check queries
+    try:
+        db_enrollment = db.execute(writes.insert_enrollment(db, enrollment.dict())).first()
+    except IntegrityError:
+        db.rollback()
+        student_exists, course_exists = db.execute(
+            writes.missing_references(enrollment.student_id, enrollment.course_id)
+        ).one()
+        if not student_exists:
+            raise HTTPException(status_code=404, detail="Student not found")
+        if not course_exists:
+            raise HTTPException(status_code=404, detail="Course not found")
+        raise
+    if db_enrollment is None:
         raise HTTPException(status_code=400, detail="Duplicate enrollment")
-    
-    db_enrollment = models.Enrollment(**enrollment.dict())
-    db.add(db_enrollment)
+    analytics.record_enrollments(db, [db_enrollment._mapping])
     db.commit()
-    db.refresh(db_enrollment)
+    response_cache.invalidate(roster_tag(enrollment.course_id))
     return db_enrollment
 
-@app.get("/courses/{course_id}/students", response_model=List[schemas.Student])
+@router.post("/enrollments/batch", response_model=schemas.EnrollmentBatchResult, status_code=status.HTTP_201_CREATED)
+def create_enrollments(
+    batch: schemas.EnrollmentBatchCreate,
+    db: Session = Depends(get_db),
+    current_user: schemas.TokenData = Depends(get_current_user)
+):
+    # All or nothing: unknown ids reject the whole batch, existing enrollments are skipped
+    existing = db.execute(writes.existing_ids(batch.student_ids, batch.course_ids)).all()
+    missing = writes.missing_ids(existing, batch.student_ids, batch.course_ids)
+    if missing:
+        raise HTTPException(status_code=404, detail={"message": "Students or courses not found", **missing})
+    try:
+        created = db.execute(
+            writes.insert_enrollments(db, batch.student_ids, batch.course_ids, batch.semester)
+        ).all()
+        analytics.record_enrollments(db, [row._mapping for row in created])
+        db.commit()
+    except IntegrityError:
+        # A student or course was deleted after the check above
+        db.rollback()
+        raise HTTPException(status_code=404, detail="Students or courses not found")
+
+    response_cache.invalidate(*(roster_tag(course_id) for course_id in batch.course_ids))
+    requested = len(set(batch.student_ids)) * len(set(batch.course_ids))
+    return schemas.EnrollmentBatchResult(
+        requested=requested,
+        created=len(created),
+        already_enrolled=requested - len(created),
+        enrollments=created,
+    )
+
+@shared_router.post("/enrollments/import", response_model=schemas.ImportReport)
+async def import_enrollments(
+    request: Request,
+    format: str = Query("csv", regex="^(csv|ndjson)$"),
+    db: Session = Depends(get_db),
+    current_user: schemas.TokenData = Depends(get_current_user)
+):
+    return await bulk.consume(request.stream(), format, bulk.EnrollmentImporter(db))
+
+@router.get("/courses/{course_id}/students", response_model=List[schemas.Student])
 def get_course_students(
     course_id: int,
+    request: Request,
+    semester: Optional[str] = Query(None),
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = Query(None, description="Keyset cursor from the X-Next-Cursor header"),
+    db: Session = Depends(get_db),
+    current_user: schemas.TokenData = Depends(get_current_user)
+):
+    after_id = cursor_position(cursor, course_id=course_id, semester=semester)
+    cache_key, cached = response_cache.lookup(
+        request, f"roster:{course_id}:{semester}:{limit}:{after_id}", [roster_tag(course_id)]
+    )
+    if cached:
+        return cached
+
+    # Semi-join so a student enrolled in several semesters appears once
+    enrolled = select(models.Enrollment.student_id).where(models.Enrollment.course_id == course_id)
+    if semester:
+        enrolled = enrolled.where(models.Enrollment.semester == semester)
+    query = db.query(*models.STUDENT_COLUMNS).filter(models.Student.id.in_(enrolled))
+    if after_id is not None:
+        query = query.filter(models.Student.id > after_id)
+    students = query.order_by(models.Student.id).limit(limit).all()
+
+    # Only an empty page needs to tell "no students" from "no course"
+    if not students and db.get(models.Course, course_id) is None:
+        raise HTTPException(status_code=404, detail="Course not found")
+    return response_cache.store(
+        request, cache_key,
+        encode_rows(students, models.STUDENT_FIELDS, schemas.Student),
+        next_cursor_headers(students, limit, lambda s: {"course_id": course_id, "semester": semester, "id": s.id}),
+    )
+
+# Roster and schedule: one aggregate query plus one eager-loaded page query each
+@shared_router.get("/courses/{course_id}/roster", response_model=schemas.CourseRoster)
+def get_course_roster(
+    course_id: int,
+    semester: Optional[str] = Query(None),
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
     db: Session = Depends(get_db),
     current_user: schemas.TokenData = Depends(get_current_user)
 ):
-    students = db.query(models.Student).join(models.Enrollment).filter(
+    after_id = cursor_position(cursor, semester=semester)
+    joined = [models.Enrollment.course_id == models.Course.id]
+    if semester:
+        joined.append(models.Enrollment.semester == semester)
+    row = db.execute(
+        select(
+            models.Course,
+            func.count(distinct(models.Enrollment.student_id)),
+            func.count(models.Enrollment.id),
+        )
+        .outerjoin(models.Enrollment, and_(*joined))
+        .where(models.Course.id == course_id)
+        .group_by(models.Course.id)
+    ).first()
+    if row is None:
+        raise HTTPException(status_code=404, detail="Course not found")
+    course, headcount, enrollment_count = row
+
+    query = db.query(models.Enrollment).options(joinedload(models.Enrollment.student)).filter(
         models.Enrollment.course_id == course_id
-    ).all()
-    return students
+    )
+    if semester:
+        query = query.filter(models.Enrollment.semester == semester)
+    if after_id is not None:
+        query = query.filter(models.Enrollment.id > after_id)
+    enrollments = query.order_by(models.Enrollment.id).limit(limit).all()
 
-# Health check endpoint
-@app.get("/health")
-def health_check():
-    return {"status": "healthy"}
+    return schemas.CourseRoster(
+        course=course,
+        semester=semester,
+        headcount=headcount,
+        enrollment_count=enrollment_count,
+        total_credits=enrollment_count * (course.credits or 0),
+        students=[
+            schemas.RosterEntry(enrollment_id=e.id, semester=e.semester, student=e.student)
+            for e in enrollments
+        ],
+        next_cursor=next_cursor(enrollments, limit, lambda e: {"semester": semester, "id": e.id}),
+    )
+
+@shared_router.get("/students/{student_id}/schedule", response_model=schemas.StudentSchedule)
+def get_student_schedule(
+    student_id: int,
+    semester: Optional[str] = Query(None),
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    db: Session = Depends(get_db),
+    current_user: schemas.TokenData = Depends(get_current_user)
+):
+    after_id = cursor_position(cursor, semester=semester)
+    joined = [models.Enrollment.student_id == models.Student.id]
+    if semester:
+        joined.append(models.Enrollment.semester == semester)
+    row = db.execute(
+        select(
+            models.Student,
+            func.count(models.Enrollment.id),
+            func.coalesce(func.sum(models.Course.credits), 0),
+        )
+        .outerjoin(models.Enrollment, and_(*joined))
+        .outerjoin(models.Course, models.Course.id == models.Enrollment.course_id)
+        .where(models.Student.id == student_id)
+        .group_by(models.Student.id)
+    ).first()
+    if row is None:
+        raise HTTPException(status_code=404, detail="Student not found")
+    student, course_count, total_credits = row
+
+    query = db.query(models.Enrollment).options(joinedload(models.Enrollment.course)).filter(
+        models.Enrollment.student_id == student_id
+    )
+    if semester:
+        query = query.filter(models.Enrollment.semester == semester)
+    if after_id is not None:
+        query = query.filter(models.Enrollment.id > after_id)
+    enrollments = query.order_by(models.Enrollment.id).limit(limit).all()
+
+    return schemas.StudentSchedule(
+        student=student,
+        semester=semester,
+        course_count=course_count,
+        total_credits=total_credits,
+        courses=[
+            schemas.ScheduleEntry(enrollment_id=e.id, semester=e.semester, course=e.course)
+            for e in enrollments
+        ],
+        next_cursor=next_cursor(enrollments, limit, lambda e: {"semester": semester, "id": e.id}),
+    )
+
+def _pool_statuses():
+    pools = {"sync": pool_status(engine)}
+    if database.async_engine is not None:
+        pools["async"] = pool_status(database.async_engine.sync_engine)
+    return {name: stats for name, stats in pools.items() if stats is not None}
+
+# Health check endpoint: readiness comes from pool state, no query per probe.
+# async so probes answer even while the threadpool is saturated
+@shared_router.get("/health")
+async def health_check(response: Response):
+    pools = _pool_statuses()
+    if all(pool["ready"] for pool in pools.values()):
+        return {"status": "healthy", "pools": pools}
+    response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    return {"status": "unavailable", "pools": pools}
+
+@shared_router.get("/metrics/cache")
+async def cache_metrics():
+    return response_cache.snapshot()
+
+@shared_router.get("/metrics/auth")
+async def auth_metrics():
+    return login_metrics()
+
+# The job pool is reported but left out of /health: it is meant to be fully used
+@shared_router.get("/metrics/pool")
+async def pool_metrics():
+    return {**_pool_statuses(), **jobs.runner.pool_statuses()}
+
+@shared_router.get("/metrics/jobs")
+def job_metrics(db: Session = Depends(get_db)):
+    return jobs.snapshot(db)
+
+# Prometheus scrape endpoint: per-route request metrics plus the snapshots above
+@shared_router.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics(db: Session = Depends(get_db)):
+    pools = {**_pool_statuses(), **jobs.runner.pool_statuses()}
+    return PlainTextResponse(
+        instrumentation.render({
+            "app_pool": [({"pool": name}, stats) for name, stats in pools.items()],
+            "app_jobs": [({}, jobs.snapshot(db))],
+            "app_response_cache": [({}, response_cache.snapshot())],
+            "app_login": [({}, login_metrics())],
+        }),
+        media_type="text/plain; version=0.0.4",
+    )
 
 # Search endpoint
-@app.get("/search/students", response_model=List[schemas.Student])
+@router.get("/search/students", response_model=List[schemas.Student])
 def search_students(
     q: str = Query(..., min_length=2),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="Cursor from the X-Next-Cursor header"),
     db: Session = Depends(get_db),
     current_user: schemas.TokenData = Depends(get_current_user)
 ):
-    return db.query(models.Student).filter(
-        models.Student.name.ilike(f"%{q}%") |
-        models.Student.email.ilike(f"%{q}%") |
-        models.Student.department.ilike(f"%{q}%")
-    ).all()
\ No newline at end of file
+    offset = cursor_position(cursor, key="offset", q=q) or 0
+    students = search.search_students(db, q, limit, offset)
+    return json_response(
+        encode_rows(students, models.STUDENT_FIELDS, schemas.Student),
+        next_cursor_headers(students, limit, lambda s: {"q": q, "offset": offset + limit}),
+    )
+
+def create_app() -> FastAPI:
+    app = FastAPI(
+        title="College Management System API",
+        description="API for managing students, courses, and enrollments",
+        version="1.0.0",
+        lifespan=lifespan,
+        default_response_class=ORJSONResponse,
+    )
+    # CORS Middleware
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+        expose_headers=["X-Next-Cursor", "ETag", "Server-Timing", "X-Profile-Id"],
+    )
+    # Outermost, so its timings cover CORS and routing too
+    app.add_middleware(instrumentation.InstrumentationMiddleware)
+
+    app.include_router(shared_router)
+    app.include_router(async_routes.router if database.ASYNC_DB else router)
+    app.include_router(analytics.router)
+    app.include_router(jobs.router)
+    return app
+
+app = create_app()
@@ -1,4 +1,7 @@
-from sqlalchemy import Column, Integer, String, ForeignKey
+from datetime import datetime
+
+from sqlalchemy import JSON, Boolean, Column, DateTime, Integer, String, Text, ForeignKey, Index, UniqueConstraint
+from sqlalchemy.orm import relationship
 from .database import Base
 
 class User(Base):
@@ -16,6 +19,13 @@ class Student(Base):
     email = Column(String, unique=True, index=True)
     department = Column(String)
 
+    # Backs department filters and (department, id) keyset pagination
+    __table_args__ = (Index("ix_students_department_id", "department", "id"),)
+
+# Column projection for list/export endpoints that skip ORM objects
+STUDENT_FIELDS = ("id", "name", "email", "department")
+STUDENT_COLUMNS = tuple(getattr(Student, field) for field in STUDENT_FIELDS)
+
 class Course(Base):
     __tablename__ = "courses"
 
@@ -30,4 +40,58 @@ class Enrollment(Base):
     id = Column(Integer, primary_key=True, index=True)
     student_id = Column(Integer, ForeignKey("students.id"))
     course_id = Column(Integer, ForeignKey("courses.id"))
-    semester = Column(String)
\ No newline at end of file
+    semester = Column(String)
+
+    student = relationship("Student")
+    course = relationship("Course")
+
+    # The unique constraint's index leads with student_id and serves schedules;
+    # the second index serves course rosters filtered by semester
+    __table_args__ = (
+        UniqueConstraint("student_id", "course_id", "semester", name="uq_enrollments_student_course_semester"),
+        Index("ix_enrollments_course_semester_student", "course_id", "semester", "student_id"),
+    )
+
+# Rollups behind /analytics, kept current by app/analytics.py on every
+# enrollment write and rebuilt from scratch by POST /analytics/refresh
+class CourseSemesterStat(Base):
+    __tablename__ = "course_semester_stats"
+
+    course_id = Column(Integer, ForeignKey("courses.id"), primary_key=True)
+    semester = Column(String, primary_key=True)
+    enrollment_count = Column(Integer, nullable=False, default=0)
+
+class StudentCreditLoad(Base):
+    __tablename__ = "student_credit_loads"
+
+    student_id = Column(Integer, ForeignKey("students.id"), primary_key=True)
+    semester = Column(String, primary_key=True)
+    course_count = Column(Integer, nullable=False, default=0)
+    credits = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (Index("ix_student_credit_loads_semester_student", "semester", "student_id"),)
+
+# Background work run by app/jobs.py. `checkpoint` is committed together with
+# each chunk's writes, so a job re-queued after a restart resumes from there
+class Job(Base):
+    __tablename__ = "jobs"
+
+    id = Column(Integer, primary_key=True)
+    kind = Column(String, nullable=False)
+    status = Column(String, nullable=False, default="queued")
+    params = Column(JSON, nullable=False, default=dict)
+    progress = Column(Integer, nullable=False, default=0)
+    total = Column(Integer)
+    checkpoint = Column(JSON)
+    result = Column(JSON)
+    error = Column(Text)
+    cancel_requested = Column(Boolean, nullable=False, default=False)
+    submitted_by = Column(String)
+    worker = Column(String)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    started_at = Column(DateTime)
+    finished_at = Column(DateTime)
+    heartbeat_at = Column(DateTime)
+
+    # Workers claim the oldest queued job; listings filter by status
+    __table_args__ = (Index("ix_jobs_status_id", "status", "id"),)
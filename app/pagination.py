@@ -0,0 +1,104 @@
+import base64
+import csv
+import io
+import json
+from itertools import islice
+from typing import Callable, Iterable, Optional, Sequence, Tuple
+
+from fastapi import HTTPException, Response
+
+from .serialization import dumps
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+# Opaque cursors: urlsafe base64 of the last row's keyset values
+def encode_cursor(**keys) -> str:
+    raw = json.dumps(keys, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str]) -> dict:
+    if not cursor:
+        return {}
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        keys = json.loads(raw)
+    except ValueError:
+        keys = None
+    if not isinstance(keys, dict):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return keys
+
+
+def cursor_position(cursor: Optional[str], key: str = "id", **expected) -> Optional[int]:
+    """Decode a cursor and check it was issued for the same filters."""
+    after = decode_cursor(cursor)
+    if not after:
+        return None
+    position = after.get(key)
+    if not isinstance(position, int) or position < 0 or any(
+        after.get(name) != value for name, value in expected.items()
+    ):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return position
+
+
+def cursor_keys(cursor: Optional[str], keys: Sequence[str], **expected) -> Optional[Tuple]:
+    """Like cursor_position, for a composite keyset: the values of `keys`, in order."""
+    after = decode_cursor(cursor)
+    if not after:
+        return None
+    if any(after.get(key) is None for key in keys) or any(
+        after.get(name) != value for name, value in expected.items()
+    ):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return tuple(after[key] for key in keys)
+
+
+def next_cursor(rows: list, limit: int, key: Callable[[object], dict]) -> Optional[str]:
+    """Advertise the next page only when this one came back full."""
+    if rows and len(rows) == limit:
+        return encode_cursor(**key(rows[-1]))
+    return None
+
+
+def next_cursor_headers(rows: list, limit: int, key: Callable[[object], dict]) -> dict:
+    cursor = next_cursor(rows, limit, key)
+    return {NEXT_CURSOR_HEADER: cursor} if cursor else {}
+
+
+def set_next_cursor(response: Response, rows: list, limit: int, key: Callable[[object], dict]):
+    response.headers.update(next_cursor_headers(rows, limit, key))
+
+
+# NDJSON export: one JSON object per row, flushed in chunks
+def iter_ndjson(rows: Iterable[Sequence], fields: Sequence[str], chunk_size: int = 1000):
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            break
+        yield b"".join(dumps(dict(zip(fields, row))) + b"\n" for row in chunk)
+
+
+async def aiter_ndjson(result, fields: Sequence[str], chunk_size: int = 1000):
+    async for chunk in result.partitions(chunk_size):
+        yield b"".join(dumps(dict(zip(fields, row))) + b"\n" for row in chunk)
+
+
+# CSV export: header row, then rows flushed in chunks
+def iter_csv(rows: Iterable[Sequence], fields: Sequence[str], chunk_size: int = 1000):
+    rows = iter(rows)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(fields)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        writer.writerows(chunk)
+        if buffer.tell():
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        if not chunk:
+            break
@@ -0,0 +1,138 @@
+import functools
+import os
+import threading
+import time
+import weakref
+from typing import Optional
+
+from sqlalchemy import exc
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+# How long a failed checkout keeps /health unready if nothing succeeds after it
+ERROR_WINDOW_SECONDS = float(os.getenv("DB_POOL_ERROR_WINDOW", "10"))
+
+
+def _env_flag(name: str, default: str) -> bool:
+    return os.getenv(name, default).lower() in ("1", "true", "yes")
+
+
+class PoolMetrics:
+    """Checkout counters for one engine's pool; they survive engine.dispose()."""
+
+    def __init__(self, max_overflow: int):
+        self._lock = threading.Lock()
+        self.max_overflow = max_overflow
+        self.acquisitions = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self.overflow_events = 0
+        self.timeouts = 0
+        self.errors = 0
+        self.last_success_at: Optional[float] = None
+        self.last_error_at: Optional[float] = None
+
+    def record_checkout(self, waited: float, overflowed: bool):
+        with self._lock:
+            self.acquisitions += 1
+            self.wait_seconds_total += waited
+            self.wait_seconds_max = max(self.wait_seconds_max, waited)
+            self.overflow_events += overflowed
+            self.last_success_at = time.time()
+
+    def record_failure(self, timed_out: bool):
+        with self._lock:
+            if timed_out:
+                # Exhaustion is visible live in checked_out; only errors linger
+                self.timeouts += 1
+            else:
+                self.errors += 1
+                self.last_error_at = time.time()
+
+    def snapshot(self, pool) -> dict:
+        size, max_overflow = pool.size(), self.max_overflow
+        checked_out = pool.checkedout()
+        exhausted = max_overflow >= 0 and checked_out >= size + max_overflow
+        failing = (
+            self.last_error_at is not None
+            and time.time() - self.last_error_at < ERROR_WINDOW_SECONDS
+            and (self.last_success_at is None or self.last_success_at < self.last_error_at)
+        )
+        return {
+            "ready": not (exhausted or failing),
+            "size": size,
+            "max_overflow": max_overflow,
+            "checked_out": checked_out,
+            "idle": pool.checkedin(),
+            "overflow": max(pool.overflow(), 0),
+            "acquisitions": self.acquisitions,
+            "wait_seconds_total": round(self.wait_seconds_total, 6),
+            "wait_seconds_max": round(self.wait_seconds_max, 6),
+            "overflow_events": self.overflow_events,
+            "timeouts": self.timeouts,
+            "errors": self.errors,
+        }
+
+
+_metrics: "weakref.WeakKeyDictionary[Engine, PoolMetrics]" = weakref.WeakKeyDictionary()
+
+
+def instrument_pool(engine: Engine, options: dict):
+    """Time checkouts by wrapping engine.connect(), which sync and async Sessions go through.
+
+    `options` are the pool_options() the engine was created with; engines
+    without them (in-memory SQLite) are left alone. Only public pool
+    accessors are read, so nothing depends on the pool's internals.
+    """
+    if not options:
+        return
+    metrics = _metrics[engine] = PoolMetrics(options["max_overflow"])
+    connect = engine.connect
+
+    @functools.wraps(connect)
+    def timed_connect():
+        started = time.perf_counter()
+        overflow = engine.pool.overflow()
+        try:
+            connection = connect()
+        except exc.TimeoutError:
+            metrics.record_failure(timed_out=True)
+            raise
+        except Exception:
+            metrics.record_failure(timed_out=False)
+            raise
+        # overflow() starts at -pool_size and counts up as connections are opened
+        metrics.record_checkout(time.perf_counter() - started, engine.pool.overflow() > max(overflow, 0))
+        return connection
+
+    engine.connect = timed_connect
+
+
+def pool_options(url, asynchronous: bool = False) -> dict:
+    """create_engine() pool arguments from DB_POOL_* environment variables."""
+    url = make_url(url)
+    if url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:"):
+        return {}
+    return {
+        "poolclass": AsyncAdaptedQueuePool if asynchronous else QueuePool,
+        "pool_size": int(os.getenv("DB_POOL_SIZE", "5")),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "10")),
+        "pool_timeout": float(os.getenv("DB_POOL_TIMEOUT", "30")),
+        "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", "1800")),
+        "pool_pre_ping": _env_flag("DB_POOL_PRE_PING", "true"),
+    }
+
+
+def job_pool_options(url, size: int) -> dict:
+    """A separate fixed-size pool for background jobs, so they never draw on the API pool."""
+    options = pool_options(url)
+    if options:
+        options.update(pool_size=size, max_overflow=0)
+    return options
+
+
+def pool_status(engine) -> Optional[dict]:
+    metrics = _metrics.get(engine)
+    if metrics is None:
+        return None
+    return metrics.snapshot(engine.pool)
@@ -0,0 +1,135 @@
+import hashlib
+import json
+import os
+import threading
+from typing import Iterable, List, Optional, Tuple
+
+from fastapi import Request, Response
+
+from .cache import TTLCache
+from .serialization import dumps
+
+# Entries are keyed by the current generation of every tag they depend on;
+# invalidating a tag bumps its generation, so stale entries are never read
+# again and simply age out of the backend.
+RESPONSE_CACHE_URL = os.getenv("RESPONSE_CACHE_URL", "memory")
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "10000"))
+RESPONSE_CACHE_TTL = int(os.getenv("RESPONSE_CACHE_TTL", "60"))
+
+
+class MemoryBackend:
+    def __init__(self, maxsize: int, ttl: int):
+        self._entries = TTLCache(maxsize, ttl)
+        self._generations = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self._entries.get(key)
+
+    def set(self, key: str, value: bytes):
+        self._entries.set(key, value)
+
+    def generations(self, tags: List[str]) -> List[int]:
+        return [self._generations.get(tag, 0) for tag in tags]
+
+    def bump(self, tag: str):
+        with self._lock:
+            self._generations[tag] = self._generations.get(tag, 0) + 1
+
+
+class RedisBackend:
+    """Any client with redis-py's get/set/mget/incr works, e.g. a local stand-in."""
+
+    def __init__(self, client, ttl: int):
+        self.client = client
+        self.ttl = ttl
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self.client.get(f"resp:{key}")
+
+    def set(self, key: str, value: bytes):
+        self.client.set(f"resp:{key}", value, ex=self.ttl)
+
+    def generations(self, tags: List[str]) -> List[int]:
+        if not tags:
+            return []
+        return [int(value or 0) for value in self.client.mget([f"gen:{tag}" for tag in tags])]
+
+    def bump(self, tag: str):
+        self.client.incr(f"gen:{tag}")
+
+
+def _make_backend(url: str):
+    if url == "memory":
+        return MemoryBackend(RESPONSE_CACHE_SIZE, RESPONSE_CACHE_TTL)
+    import redis  # optional dependency, only needed for a shared cache
+    return RedisBackend(redis.Redis.from_url(url), RESPONSE_CACHE_TTL)
+
+
+def student_tag(student_id: int) -> str:
+    return f"student:{student_id}"
+
+def department_tag(department: str) -> str:
+    return f"students:dept:{department}"
+
+def roster_tag(course_id: int) -> str:
+    return f"course:{course_id}:students"
+
+
+def encode(content) -> bytes:
+    # Same encoding as the app's default ORJSONResponse
+    return dumps(content)
+
+
+class ResponseCache:
+    def __init__(self, backend):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self.invalidations = 0
+
+    def lookup(self, request: Request, key: str, tags: Iterable[str]) -> Tuple[str, Optional[Response]]:
+        """Return (versioned key, cached response or None) for a read route."""
+        tags = list(tags)
+        versions = ".".join(str(version) for version in self.backend.generations(tags))
+        cache_key = f"{key}@{versions}"
+        entry = self.backend.get(cache_key)
+        if entry is None:
+            self.misses += 1
+            return cache_key, None
+        self.hits += 1
+        etag, headers, body = entry.split(b"\n", 2)
+        return cache_key, self._respond(request, body, json.loads(headers), etag.decode())
+
+    def store(self, request: Request, cache_key: str, body: bytes, headers: Optional[dict] = None) -> Response:
+        headers = headers or {}
+        etag = f'"{hashlib.sha1(body).hexdigest()}"'
+        self.backend.set(cache_key, b"\n".join([etag.encode(), json.dumps(headers).encode(), body]))
+        return self._respond(request, body, headers, etag)
+
+    def _respond(self, request: Request, body: bytes, headers: dict, etag: str) -> Response:
+        if_none_match = request.headers.get("if-none-match", "")
+        if etag in (candidate.strip().removeprefix("W/") for candidate in if_none_match.split(",")):
+            self.not_modified += 1
+            return Response(status_code=304, headers={"ETag": etag})
+        return Response(content=body, media_type="application/json", headers={**headers, "ETag": etag})
+
+    def invalidate(self, *tags: str):
+        for tag in set(tags):
+            self.backend.bump(tag)
+        self.invalidations += len(set(tags))
+
+    def snapshot(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "backend": type(self.backend).__name__,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+            "not_modified": self.not_modified,
+            "invalidations": self.invalidations,
+        }
+
+
+response_cache = ResponseCache(_make_backend(RESPONSE_CACHE_URL))
@@ -1,5 +1,6 @@
-from pydantic import BaseModel
-from typing import Optional
+from datetime import datetime
+from pydantic import BaseModel, Field, conlist, root_validator
+from typing import List, Optional
 
 class Token(BaseModel):
     access_token: str
@@ -12,6 +13,10 @@ class UserCreate(BaseModel):
     username: str
     password: str
 
+class PasswordChange(BaseModel):
+    current_password: str
+    new_password: str
+
 class StudentBase(BaseModel):
     name: str
     email: str
@@ -52,4 +57,132 @@ class Enrollment(EnrollmentBase):
     id: int
 
     class Config:
-        orm_mode = True
\ No newline at end of file
+        orm_mode = True
+
+class EnrollmentBatchCreate(BaseModel):
+    student_ids: conlist(int, min_items=1, max_items=1000)
+    course_ids: conlist(int, min_items=1, max_items=100)
+    semester: str
+
+class EnrollmentBatchResult(BaseModel):
+    requested: int
+    created: int
+    already_enrolled: int
+    enrollments: List[Enrollment]
+
+class ImportRowError(BaseModel):
+    line: int
+    error: str
+
+class ImportReport(BaseModel):
+    received: int
+    inserted: int
+    rejected: int
+    errors: List[ImportRowError]
+    elapsed_seconds: float
+    rows_per_second: float
+
+class RosterEntry(BaseModel):
+    enrollment_id: int
+    semester: str
+    student: Student
+
+class CourseRoster(BaseModel):
+    course: Course
+    semester: Optional[str]
+    headcount: int
+    enrollment_count: int
+    total_credits: int
+    students: List[RosterEntry]
+    next_cursor: Optional[str]
+
+class ScheduleEntry(BaseModel):
+    enrollment_id: int
+    semester: str
+    course: Course
+
+class StudentSchedule(BaseModel):
+    student: Student
+    semester: Optional[str]
+    course_count: int
+    total_credits: int
+    courses: List[ScheduleEntry]
+    next_cursor: Optional[str]
+
+class CourseEnrollmentStat(BaseModel):
+    course_id: int
+    code: str
+    name: str
+    semester: str
+    enrollment_count: int
+    credit_hours: int
+
+    class Config:
+        orm_mode = True
+
+class CreditLoad(BaseModel):
+    student_id: int
+    name: str
+    department: str
+    semester: str
+    course_count: int
+    credits: int
+
+    class Config:
+        orm_mode = True
+
+class DepartmentStat(BaseModel):
+    department: str
+    students: int
+    enrolled_students: int
+    enrollments: int
+    credits: int
+
+class SummaryRefresh(BaseModel):
+    course_semester_rows: int
+    student_credit_rows: int
+    elapsed_seconds: float
+
+class Job(BaseModel):
+    id: int
+    kind: str
+    status: str
+    progress: int
+    total: Optional[int]
+    error: Optional[str]
+    cancel_requested: bool
+    submitted_by: Optional[str]
+    created_at: datetime
+    started_at: Optional[datetime]
+    finished_at: Optional[datetime]
+
+    class Config:
+        orm_mode = True
+
+# Filters each /analytics report accepts, matching its query function's arguments
+REPORT_FILTERS = {
+    "course-enrollments": ("semester", "course_id"),
+    "credit-loads": ("semester", "department"),
+}
+
+class ReportJobCreate(BaseModel):
+    report: str = Field(..., regex="^(course-enrollments|credit-loads)$")
+    semester: Optional[str]
+    course_id: Optional[int]
+    department: Optional[str]
+
+    @root_validator(skip_on_failure=True)
+    def check_filters(cls, values):
+        allowed = REPORT_FILTERS[values["report"]]
+        unsupported = [
+            name for name in ("semester", "course_id", "department")
+            if values.get(name) is not None and name not in allowed
+        ]
+        if unsupported:
+            raise ValueError(f"{values['report']} does not filter by {', '.join(unsupported)}")
+        return values
+
+class RolloverJobCreate(BaseModel):
+    from_semester: str
+    to_semester: str
+    course_ids: Optional[conlist(int, min_items=1, max_items=1000)]
@@ -0,0 +1,185 @@
+import heapq
+import os
+import threading
+from collections import Counter, defaultdict
+from typing import Dict, List, Set, Tuple
+
+from sqlalchemy import Row, case, event, func, or_, select
+from sqlalchemy.orm import Session
+
+from . import models
+
+SIMILARITY_THRESHOLD = float(os.getenv("SEARCH_SIMILARITY_THRESHOLD", "0.3"))
+SEARCH_FIELDS = ("name", "email", "department")
+
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _postgres_search(db: Session, q: str, limit: int, offset: int) -> List[Row]:
+    Student = models.Student
+    columns = [getattr(Student, field) for field in SEARCH_FIELDS]
+    contains = f"%{_escape_like(q)}%"
+    prefix = f"{_escape_like(q)}%"
+
+    similarity = func.greatest(*(func.similarity(column, q) for column in columns))
+    rank = case(
+        (or_(*(column.ilike(prefix, escape="\\") for column in columns)), 2.0),
+        (or_(*(column.ilike(contains, escape="\\") for column in columns)), 1.0),
+        else_=0.0,
+    ) + similarity
+    match = or_(
+        *(column.ilike(contains, escape="\\") for column in columns),
+        *(column.op("%")(q) for column in columns),
+    )
+    # % compares against pg_trgm.similarity_threshold, not ours; set it for this transaction only
+    db.execute(select(func.set_config("pg_trgm.similarity_threshold", str(SIMILARITY_THRESHOLD), True)))
+    return db.execute(
+        select(*models.STUDENT_COLUMNS).where(match).order_by(rank.desc(), Student.id).offset(offset).limit(limit)
+    ).all()
+
+
+def trigrams(value: str) -> Set[str]:
+    padded = f"  {value.lower()} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def similarity(left: Set[str], right: Set[str]) -> float:
+    shared = len(left & right)
+    return shared / (len(left) + len(right) - shared) if shared else 0.0
+
+
+class MemoryIndex:
+    """In-process trigram index used when the database has no pg_trgm (SQLite)."""
+
+    def __init__(self):
+        self._docs: Dict[int, Tuple[str, ...]] = {}
+        self._postings: Dict[str, Set[int]] = defaultdict(set)
+        self._lock = threading.RLock()
+        self._loaded = False
+
+    def invalidate(self):
+        with self._lock:
+            self._loaded = False
+
+    def _ensure_loaded(self, db: Session):
+        if self._loaded:
+            return
+        with self._lock:
+            if self._loaded:
+                return
+            self._docs.clear()
+            self._postings.clear()
+            columns = [getattr(models.Student, field) for field in SEARCH_FIELDS]
+            rows = db.execute(select(models.Student.id, *columns).execution_options(yield_per=10000))
+            for row in rows:
+                self._add(row[0], tuple(row[1:]))
+            self._loaded = True
+
+    def _add(self, student_id: int, fields: Tuple[str, ...]):
+        fields = tuple((value or "").lower() for value in fields)
+        self._docs[student_id] = fields
+        for field in fields:
+            for gram in trigrams(field):
+                self._postings[gram].add(student_id)
+
+    def _remove(self, student_id: int):
+        fields = self._docs.pop(student_id, None)
+        for field in fields or ():
+            for gram in trigrams(field):
+                self._postings[gram].discard(student_id)
+
+    def upsert(self, student_id: int, fields: Tuple[str, ...]):
+        with self._lock:
+            if self._loaded:
+                self._remove(student_id)
+                self._add(student_id, fields)
+
+    def remove(self, student_id: int):
+        with self._lock:
+            if self._loaded:
+                self._remove(student_id)
+
+    def _substring_candidates(self, q: str) -> Set[int]:
+        if len(q) < 3:
+            return set(self._docs)
+        # Every substring match contains all of the query's inner trigrams
+        postings = sorted((self._postings.get(q[i:i + 3], set()) for i in range(len(q) - 2)), key=len)
+        return postings[0].intersection(*postings[1:])
+
+    def _fuzzy_candidates(self, q_grams: Set[str]) -> List[int]:
+        # A match must share at least threshold * |query trigrams| trigrams
+        needed = max(1, int(SIMILARITY_THRESHOLD * len(q_grams)))
+        counts = Counter()
+        for gram in q_grams:
+            counts.update(self._postings.get(gram, ()))
+        return [student_id for student_id, count in counts.items() if count >= needed]
+
+    def search(self, db: Session, q: str, limit: int, offset: int) -> List[int]:
+        """Ids ranked like the PostgreSQL query: prefix, substring, then fuzzy.
+
+        Within the prefix and substring tiers, shorter fields rank higher, which
+        tracks trigram similarity without computing it for every match.
+        """
+        self._ensure_loaded(db)
+        q = q.lower()
+        wanted = offset + limit
+        ranked = []
+        with self._lock:
+            for student_id in self._substring_candidates(q):
+                tier, best = 0, 0.0
+                for field in self._docs[student_id]:
+                    if q in field:
+                        tier = max(tier, 2 if field.startswith(q) else 1)
+                        best = max(best, len(q) / len(field))
+                if tier:
+                    ranked.append((-(tier + best), student_id))
+
+            # Fuzzy matches always rank below substring matches
+            if len(ranked) < wanted:
+                q_grams = trigrams(q)
+                matched = {student_id for _, student_id in ranked}
+                for student_id in self._fuzzy_candidates(q_grams):
+                    if student_id in matched:
+                        continue
+                    best = max(similarity(q_grams, trigrams(field)) for field in self._docs[student_id])
+                    if best >= SIMILARITY_THRESHOLD:
+                        ranked.append((-best, student_id))
+        return [student_id for _, student_id in heapq.nsmallest(wanted, ranked)][offset:]
+
+
+memory_index = MemoryIndex()
+
+
+def index_student(student):
+    """Index a student object or row; for writes that bypass the ORM events below."""
+    memory_index.upsert(student.id, tuple(getattr(student, field) for field in SEARCH_FIELDS))
+
+
+def _sync_index(mapper, connection, target):
+    index_student(target)
+
+
+def _drop_from_index(mapper, connection, target):
+    memory_index.remove(target.id)
+
+
+event.listen(models.Student, "after_insert", _sync_index)
+event.listen(models.Student, "after_update", _sync_index)
+event.listen(models.Student, "after_delete", _drop_from_index)
+
+
+def search_students(db: Session, q: str, limit: int, offset: int = 0) -> List[Row]:
+    """Ranked student search: prefix matches, then substring, then fuzzy.
+
+    Returns rows of models.STUDENT_COLUMNS rather than Student objects.
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        return _postgres_search(db, q, limit, offset)
+
+    ids = memory_index.search(db, q, limit, offset)
+    students = {
+        row.id: row
+        for row in db.execute(select(*models.STUDENT_COLUMNS).where(models.Student.id.in_(ids)))
+    }
+    return [students[student_id] for student_id in ids if student_id in students]
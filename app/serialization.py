@@ -0,0 +1,38 @@
+import os
+from typing import Iterable, List, Optional, Sequence, Type
+
+import orjson
+from fastapi import Response
+from fastapi.encoders import jsonable_encoder
+from pydantic import BaseModel
+
+# Large list routes select column tuples and encode them with orjson in one
+# pass, skipping the per-row response model FastAPI would build. Set
+# VALIDATE_RESPONSES=1 (development, CI) to check every row against its schema.
+VALIDATE_RESPONSES = os.getenv("VALIDATE_RESPONSES", "false").lower() in ("1", "true", "yes")
+
+
+def _default(value):
+    if isinstance(value, BaseModel):
+        return value.dict()
+    return jsonable_encoder(value)
+
+
+def dumps(content) -> bytes:
+    return orjson.dumps(content, default=_default)
+
+
+def rows_to_dicts(rows: Iterable[Sequence], fields: Sequence[str], schema: Optional[Type[BaseModel]] = None) -> List[dict]:
+    items = [dict(zip(fields, row)) for row in rows]
+    if schema is not None and VALIDATE_RESPONSES:
+        items = [schema(**item).dict() for item in items]
+    return items
+
+
+def encode_rows(rows: Iterable[Sequence], fields: Sequence[str], schema: Optional[Type[BaseModel]] = None) -> bytes:
+    return orjson.dumps(rows_to_dicts(rows, fields, schema), default=_default)
+
+
+def json_response(body: bytes, headers: Optional[dict] = None) -> Response:
+    """An already encoded body; FastAPI sends a returned Response as is."""
+    return Response(content=body, media_type="application/json", headers=headers)
@@ -0,0 +1,98 @@
+from typing import Dict, List, Optional
+
+from sqlalchemy import exists, literal, select, true, update
+
+from . import models
+from .database import insert_for
+
+# Single-statement writes shared by app/main.py and app/async_routes.py. The
+# unique and foreign key constraints do the checking: an empty RETURNING means
+# the row already existed, an IntegrityError means a referenced row is missing.
+STUDENTS = models.Student.__table__
+ENROLLMENTS = models.Enrollment.__table__
+ENROLLMENT_KEY = ("student_id", "course_id", "semester")
+
+
+def insert_student(db, values: dict):
+    return (
+        insert_for(db)(STUDENTS)
+        .values(**values)
+        .on_conflict_do_nothing(index_elements=["email"])
+        .returning(*STUDENTS.c)
+    )
+
+
+def update_student(student_id: int, values: dict):
+    return update(STUDENTS).where(STUDENTS.c.id == student_id).values(**values).returning(*STUDENTS.c)
+
+
+def insert_enrollment(db, values: dict):
+    return (
+        insert_for(db)(ENROLLMENTS)
+        .values(**values)
+        .on_conflict_do_nothing(index_elements=list(ENROLLMENT_KEY))
+        .returning(*ENROLLMENTS.c)
+    )
+
+
+def insert_enrollments(db, student_ids: List[int], course_ids: List[int], semester: str):
+    """Every existing (student, course) pair for the semester, skipping ones already enrolled."""
+    pairs = (
+        select(models.Student.id, models.Course.id, literal(semester))
+        .select_from(models.Student)
+        .join(models.Course, true())
+        .where(models.Student.id.in_(student_ids), models.Course.id.in_(course_ids))
+    )
+    return (
+        insert_for(db)(ENROLLMENTS)
+        .from_select(list(ENROLLMENT_KEY), pairs)
+        .on_conflict_do_nothing(index_elements=list(ENROLLMENT_KEY))
+        .returning(*ENROLLMENTS.c)
+    )
+
+
+def copy_enrollments(db, from_semester: str, to_semester: str, first_student: int, last_student: int,
+                     course_ids: Optional[List[int]] = None):
+    """Re-enroll a student id range of one semester into another, skipping existing enrollments."""
+    source = (
+        select(ENROLLMENTS.c.student_id, ENROLLMENTS.c.course_id, literal(to_semester))
+        .where(
+            ENROLLMENTS.c.semester == from_semester,
+            ENROLLMENTS.c.student_id.between(first_student, last_student),
+        )
+    )
+    if course_ids:
+        source = source.where(ENROLLMENTS.c.course_id.in_(course_ids))
+    return (
+        insert_for(db)(ENROLLMENTS)
+        .from_select(list(ENROLLMENT_KEY), source)
+        .on_conflict_do_nothing(index_elements=list(ENROLLMENT_KEY))
+        .returning(*ENROLLMENTS.c)
+    )
+
+
+def missing_references(student_id: int, course_id: int):
+    """(student exists, course exists), to explain a foreign key violation."""
+    return select(
+        exists().where(models.Student.id == student_id),
+        exists().where(models.Course.id == course_id),
+    )
+
+
+def existing_ids(student_ids: List[int], course_ids: List[int]):
+    return (
+        select(literal("student"), models.Student.id).where(models.Student.id.in_(student_ids))
+        .union_all(select(literal("course"), models.Course.id).where(models.Course.id.in_(course_ids)))
+    )
+
+
+def missing_ids(existing, student_ids: List[int], course_ids: List[int]) -> Dict[str, List[int]]:
+    """Requested ids absent from the rows of existing_ids(), by kind; empty if none."""
+    found = {"student": set(), "course": set()}
+    for kind, id_ in existing:
+        found[kind].add(id_)
+    missing = {
+        "student_ids": sorted(set(student_ids) - found["student"]),
+        "course_ids": sorted(set(course_ids) - found["course"]),
+    }
+    return {key: ids for key, ids in missing.items() if ids}
@@ -0,0 +1,80 @@
+"""Report latency from the summary tables versus live GROUP BY over enrollments.
+
+    python benchmarks/analytics_bench.py --students 10000 100000 250000
+    DATABASE_URL=postgresql://... python benchmarks/analytics_bench.py --reset
+
+Each size migrates a fresh schema to head, seeds `students` x `--per-student`
+enrollments, then times the per-course/semester report and one page of
+per-student credit loads, both from the summaries (what /analytics serves) and
+recomputed from enrollments.
+Without DATABASE_URL a throwaway SQLite file is used; with it, all of its
+tables are dropped, so --reset is required.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from os.path import dirname
+
+sys.path.append(dirname(dirname(os.path.abspath(__file__))))
+
+from bench_db import add_reset_argument, reset_schema, use_database
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--students", type=int, nargs="+", default=[10000, 100000, 250000])
+    parser.add_argument("--per-student", type=int, default=4, help="enrollments per student")
+    parser.add_argument("--courses", type=int, default=50)
+    parser.add_argument("--rounds", type=int, default=20)
+    add_reset_argument(parser)
+    args = parser.parse_args()
+    use_database(args, "analytics_bench")
+
+    from sqlalchemy import func, select
+
+    import seed
+    from app import analytics, models
+    from app.database import SessionLocal, engine
+
+    enrollment, course = models.Enrollment, models.Course
+    stats, loads = analytics.COURSE_STATS, analytics.CREDIT_LOADS
+    queries = {
+        "course_semester (summary)": select(stats).order_by(stats.c.course_id, stats.c.semester),
+        "course_semester (live)": select(enrollment.course_id, enrollment.semester, func.count())
+        .group_by(enrollment.course_id, enrollment.semester),
+        "credit_loads page (summary)": select(loads).order_by(loads.c.student_id, loads.c.semester).limit(100),
+        "credit_loads page (live)": select(enrollment.student_id, enrollment.semester, func.count(), func.sum(course.credits))
+        .join(course, course.id == enrollment.course_id)
+        .group_by(enrollment.student_id, enrollment.semester)
+        .order_by(enrollment.student_id, enrollment.semester).limit(100),
+    }
+
+    for students in args.students:
+        reset_schema()
+        db = SessionLocal()
+        try:
+            seed.seed_synthetic(db, students, args.courses, args.per_student)
+            samples = {name: [] for name in queries}
+            for _ in range(args.rounds):
+                for name, stmt in queries.items():
+                    started = time.perf_counter()
+                    db.execute(stmt).all()
+                    samples[name].append((time.perf_counter() - started) * 1000)
+        finally:
+            db.close()
+
+        print(f"\n{students * args.per_student} enrollments ({engine.dialect.name})")
+        print(f"{'query':<30}{'p50 ms':>10}{'p99 ms':>10}")
+        for name, values in samples.items():
+            print(f"{name:<30}{statistics.median(values):>10.2f}{percentile(values, 99):>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
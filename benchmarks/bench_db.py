@@ -0,0 +1,46 @@
+"""Database setup shared by the single-purpose benchmarks.
+
+Without DATABASE_URL a throwaway SQLite file is used. A DATABASE_URL is only
+accepted together with --reset, because every table in it is dropped before
+each run; point it at a dedicated benchmark database, never a real one.
+"""
+import os
+import sys
+import tempfile
+from os.path import dirname
+
+ROOT = dirname(dirname(os.path.abspath(__file__)))
+
+
+def add_reset_argument(parser):
+    parser.add_argument(
+        "--reset",
+        action="store_true",
+        help="allow dropping every table in DATABASE_URL (required when it is set)",
+    )
+
+
+def use_database(args, name):
+    """Point DATABASE_URL at a throwaway SQLite file, or refuse an external one without --reset."""
+    if "DATABASE_URL" not in os.environ:
+        os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/{name}.db"
+    elif not args.reset:
+        sys.exit("DATABASE_URL is set: every table in it will be dropped. Re-run with --reset to confirm.")
+
+
+def reset_schema():
+    """Drop everything and migrate to head, as a deployment would build the schema."""
+    from alembic import command
+    from alembic.config import Config
+    from sqlalchemy import text
+
+    from app import models
+    from app.database import engine
+
+    models.Base.metadata.drop_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(text("DROP TABLE IF EXISTS alembic_version"))
+    config = Config(os.path.join(ROOT, "alembic.ini"))
+    # alembic.ini's script_location is relative to the repository root
+    config.set_main_option("script_location", os.path.join(ROOT, "migrations"))
+    command.upgrade(config, "head")
@@ -0,0 +1,175 @@
+"""Concurrent enrollment writes: no duplicates under races, and per-write latency.
+
+    python benchmarks/enrollment_concurrency.py --pairs 50 --copies 8
+    python benchmarks/enrollment_concurrency.py --url http://localhost:8000 --skip-db
+
+The race phase fires `copies` identical POST /enrollments/ requests for each of
+`pairs` (student, course) pairs at once, then reads every course roster back:
+each pair must have exactly one 201 and one stored row. The DB phase times
+the old four-query create (student, course and duplicate checks, then insert
+and refresh) against the single INSERT ... ON CONFLICT ... RETURNING now used
+by the routes, on the database in DATABASE_URL. Both also update the analytics
+summaries and invalidate the roster cache, as POST /enrollments/ does. Expects a migrated, seeded
+database (alembic upgrade head && python seed.py); requires httpx.
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+from collections import Counter, defaultdict
+from os.path import dirname
+
+import httpx
+
+from load_test import get_token, summarize, wait_until_ready
+
+ROOT = dirname(dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+async def race(client, pairs, copies, semester):
+    statuses = defaultdict(Counter)
+    latencies = []
+
+    async def enroll(student_id, course_id):
+        started = time.perf_counter()
+        response = await client.post(
+            "/enrollments/", json={"student_id": student_id, "course_id": course_id, "semester": semester}
+        )
+        latencies.append(time.perf_counter() - started)
+        statuses[(student_id, course_id)][response.status_code] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(enroll(*pair) for pair in pairs for _ in range(copies)))
+    elapsed = time.perf_counter() - started
+
+    stored = Counter()
+    for course_id in {course_id for _, course_id in pairs}:
+        cursor = None
+        while True:
+            params = {"semester": semester, "limit": 1000, **({"cursor": cursor} if cursor else {})}
+            roster = (await client.get(f"/courses/{course_id}/roster", params=params)).json()
+            stored.update((entry["student"]["id"], course_id) for entry in roster["students"])
+            cursor = roster["next_cursor"]
+            if not cursor:
+                break
+
+    wrong = {
+        f"{student_id}/{course_id}": dict(statuses[(student_id, course_id)])
+        for student_id, course_id in pairs
+        if statuses[(student_id, course_id)] != Counter({201: 1, 400: copies - 1})
+    }
+    return {
+        "pairs": len(pairs),
+        "copies": copies,
+        "stored_rows": sum(stored.values()),
+        "duplicate_rows": sum(count - 1 for count in stored.values() if count > 1),
+        "pairs_with_unexpected_statuses": wrong,
+        "http": summarize(latencies, 0, elapsed),
+    }
+
+
+async def drive(base_url, args, semester):
+    limits = httpx.Limits(max_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        token = await get_token(client, args.username, args.password)
+        client.headers["Authorization"] = f"Bearer {token}"
+        students = (await client.get("/students/", params={"limit": args.pairs})).json()
+        course_ids = list(range(1, args.courses + 1))
+        pairs = [(student["id"], course_ids[i % len(course_ids)]) for i, student in enumerate(students)]
+        return await race(client, pairs, args.copies, semester)
+
+
+def time_writes(args, semester):
+    from app import analytics, models, writes
+    from app.database import SessionLocal
+    from app.response_cache import response_cache, roster_tag
+
+    def legacy_create(db, values):
+        if db.query(models.Student).filter(models.Student.id == values["student_id"]).first() is None:
+            return None
+        if db.query(models.Course).filter(models.Course.id == values["course_id"]).first() is None:
+            return None
+        if db.query(models.Enrollment).filter_by(**values).first() is not None:
+            return None
+        enrollment = models.Enrollment(**values)
+        db.add(enrollment)
+        db.flush()
+        analytics.record_enrollments(db, [values])
+        db.commit()
+        db.refresh(enrollment)
+        response_cache.invalidate(roster_tag(values["course_id"]))
+        return enrollment
+
+    def constraint_create(db, values):
+        # The body of POST /enrollments/ (create_enrollment in app/main.py)
+        enrollment = db.execute(writes.insert_enrollment(db, values)).first()
+        if enrollment is not None:
+            analytics.record_enrollments(db, [enrollment._mapping])
+        db.commit()
+        response_cache.invalidate(roster_tag(values["course_id"]))
+        return enrollment
+
+    results = {}
+    with SessionLocal() as db:
+        student_ids = [row[0] for row in db.query(models.Student.id).order_by(models.Student.id).limit(args.writes)]
+        course_id = db.query(models.Course.id).order_by(models.Course.id).first()[0]
+        approaches = {"four_queries": legacy_create, "insert_on_conflict": constraint_create}
+        for name, create in approaches.items():
+            latencies = []
+            started = time.perf_counter()
+            for student_id in student_ids:
+                values = {"student_id": student_id, "course_id": course_id, "semester": f"{semester} {name}"}
+                began = time.perf_counter()
+                create(db, values)
+                latencies.append(time.perf_counter() - began)
+            results[name] = summarize(latencies, 0, time.perf_counter() - started)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", help="race an already running server instead of starting one")
+    parser.add_argument("--async-db", action="store_true", help="start the server with ASYNC_DB=1")
+    parser.add_argument("--pairs", type=int, default=50)
+    parser.add_argument("--copies", type=int, default=8, help="identical requests per pair")
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--courses", type=int, default=2, help="course ids 1..N to enroll into")
+    parser.add_argument("--writes", type=int, default=500, help="sequential writes per approach in the DB phase")
+    parser.add_argument("--skip-db", action="store_true", help="skip the DB phase")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--username", default="admin")
+    parser.add_argument("--password", default="admin123")
+    args = parser.parse_args()
+
+    # A fresh semester per run, so earlier runs never count as duplicates
+    semester = f"Bench {int(time.time())}"
+    if args.url:
+        report = {"race": asyncio.run(drive(args.url, args, semester))}
+    else:
+        base_url = f"http://127.0.0.1:{args.port}"
+        env = dict(os.environ, ASYNC_DB="1" if args.async_db else "0")
+        process = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(args.port), "--log-level", "warning"],
+            cwd=ROOT, env=env,
+        )
+        try:
+            wait_until_ready(base_url, process)
+            report = {"race": asyncio.run(drive(base_url, args, semester))}
+        finally:
+            process.terminate()
+            process.wait()
+    if not args.skip_db:
+        report["db_writes"] = time_writes(args, semester)
+    print(json.dumps(report, indent=2))
+
+    race_report = report["race"]
+    if race_report["duplicate_rows"] or race_report["pairs_with_unexpected_statuses"]:
+        sys.exit("duplicate enrollments or unexpected statuses under concurrency")
+
+
+if __name__ == "__main__":
+    main()
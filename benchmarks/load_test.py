@@ -0,0 +1,164 @@
+"""Concurrent HTTP load against the API, comparing the sync and async DB modes.
+
+    python benchmarks/load_test.py --modes sync async --concurrency 64 --requests 4000
+    python benchmarks/load_test.py --url http://localhost:8000   # an already running server
+
+For each mode a uvicorn worker is started with ASYNC_DB set accordingly and
+the same route mix is replayed against it. Requires httpx.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import time
+from os.path import dirname
+
+import httpx
+
+ROOT = dirname(dirname(os.path.abspath(__file__)))
+
+# (name, method, path) -- {student_id}/{course_id} are filled per request
+ROUTES = [
+    ("list_students", "GET", "/students/?limit=50"),
+    ("list_by_department", "GET", "/students/?limit=50&department=Physics"),
+    ("read_student", "GET", "/students/{student_id}"),
+    ("course_students", "GET", "/courses/{course_id}/students"),
+    ("search", "GET", "/search/students?q=tha"),
+]
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def summarize(latencies, errors, elapsed):
+    count = len(latencies)
+    return {
+        "requests": count + errors,
+        "errors": errors,
+        "throughput_rps": round(count / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(statistics.median(latencies) * 1000, 2) if latencies else None,
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2) if latencies else None,
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2) if latencies else None,
+    }
+
+
+async def get_token(client, username, password):
+    response = await client.post("/token", data={"username": username, "password": password})
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+
+async def run_load(client, routes, concurrency, total, student_ids, course_ids, seed=0, render=None):
+    """Replay `total` requests from `routes` with `concurrency` workers; stats per route.
+
+    `render(name, path, rng)` may return (url, request kwargs) instead, for
+    routes that need more than ids filled into the path.
+    """
+    rng = random.Random(seed)
+    plan = [rng.choice(routes) for _ in range(total)]
+    latencies = {name: [] for name, _, _ in routes}
+    errors = {name: 0 for name, _, _ in routes}
+    queue = iter(plan)
+
+    async def worker():
+        for name, method, path in queue:
+            if render is None:
+                url, kwargs = path.format(student_id=rng.choice(student_ids), course_id=rng.choice(course_ids)), {}
+            else:
+                url, kwargs = render(name, path, rng)
+            started = time.perf_counter()
+            try:
+                response = await client.request(method, url, **kwargs)
+                ok = response.status_code < 400
+            except httpx.HTTPError:
+                ok = False
+            if ok:
+                latencies[name].append(time.perf_counter() - started)
+            else:
+                errors[name] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    report = {name: summarize(latencies[name], errors[name], elapsed) for name, _, _ in routes}
+    everything = [sample for samples in latencies.values() for sample in samples]
+    report["_all"] = summarize(everything, sum(errors.values()), elapsed)
+    return report
+
+
+async def drive(base_url, args):
+    limits = httpx.Limits(max_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        token = await get_token(client, args.username, args.password)
+        client.headers["Authorization"] = f"Bearer {token}"
+        students = (await client.get("/students/?limit=1000")).json()
+        student_ids = [student["id"] for student in students] or [1]
+        course_ids = list(range(1, args.courses + 1))
+        await run_load(client, ROUTES, args.concurrency, min(200, args.requests), student_ids, course_ids)
+        return await run_load(client, ROUTES, args.concurrency, args.requests, student_ids, course_ids)
+
+
+def wait_until_ready(base_url, process, timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("server exited during startup")
+        try:
+            if httpx.get(f"{base_url}/health", timeout=1).status_code < 500:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError("server did not become ready")
+
+
+def run_mode(mode, args):
+    env = dict(os.environ, ASYNC_DB="1" if mode == "async" else "0")
+    base_url = f"http://127.0.0.1:{args.port}"
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(args.port),
+         "--workers", str(args.workers), "--log-level", "warning"],
+        cwd=ROOT, env=env,
+    )
+    try:
+        wait_until_ready(base_url, process)
+        return asyncio.run(drive(base_url, args))
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--modes", nargs="+", choices=["sync", "async"], default=["sync", "async"])
+    parser.add_argument("--url", help="load an already running server instead of starting one per mode")
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--requests", type=int, default=4000)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--courses", type=int, default=2, help="course ids 1..N used for roster requests")
+    parser.add_argument("--username", default="admin")
+    parser.add_argument("--password", default="admin123")
+    args = parser.parse_args()
+
+    if args.url:
+        results = {"external": asyncio.run(drive(args.url, args))}
+    else:
+        results = {mode: run_mode(mode, args) for mode in args.modes}
+    print(json.dumps(results, indent=2))
+
+    if len(results) > 1 and all(mode in results for mode in ("sync", "async")):
+        sync_rps = results["sync"]["_all"]["throughput_rps"]
+        async_rps = results["async"]["_all"]["throughput_rps"]
+        print(f"async/sync throughput: {async_rps / sync_rps:.2f}x" if sync_rps else "sync mode served nothing")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Latency of /search/students at growing table sizes.
+
+    python benchmarks/search_bench.py --sizes 10000 100000 1000000
+    DATABASE_URL=postgresql://... python benchmarks/search_bench.py --reset
+
+Each size starts from a schema migrated to head. Without DATABASE_URL a
+throwaway SQLite file is used, which exercises the in-memory trigram fallback;
+against PostgreSQL the pg_trgm indexes from migration 0002 are used. With
+DATABASE_URL set, all of its tables are dropped first, so --reset is required.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from os.path import dirname
+
+sys.path.append(dirname(dirname(os.path.abspath(__file__))))
+
+from bench_db import add_reset_argument, reset_schema, use_database
+
+QUERIES = ["ast", "thapa", "jane smth", "engineering", "ra", "priya.sharma", "@synthetic", "zzzz"]
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--rounds", type=int, default=20, help="repetitions of the query set per size")
+    parser.add_argument("--limit", type=int, default=20)
+    add_reset_argument(parser)
+    args = parser.parse_args()
+    use_database(args, "search_bench")
+
+    import seed
+    from app import search
+    from app.database import SessionLocal, engine
+
+    for size in args.sizes:
+        reset_schema()
+        search.memory_index.invalidate()
+
+        db = SessionLocal()
+        try:
+            seed.seed_synthetic(db, size, courses=0, enrollments_per_student=0)
+
+            started = time.perf_counter()
+            search.search_students(db, "warmup", args.limit)
+            warmup = time.perf_counter() - started
+
+            samples = {q: [] for q in QUERIES}
+            for _ in range(args.rounds):
+                for q in QUERIES:
+                    started = time.perf_counter()
+                    search.search_students(db, q, args.limit)
+                    samples[q].append((time.perf_counter() - started) * 1000)
+        finally:
+            db.close()
+
+        everything = [sample for values in samples.values() for sample in values]
+        print(f"\n{size} students ({engine.dialect.name}), first query incl. index build: {warmup * 1000:.1f} ms")
+        print(f"{'query':<16}{'p50 ms':>10}{'p99 ms':>10}")
+        for q, values in samples.items():
+            print(f"{q:<16}{statistics.median(values):>10.2f}{percentile(values, 99):>10.2f}")
+        print(f"{'all':<16}{statistics.median(everything):>10.2f}{percentile(everything, 99):>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""Per-row cost of serializing a large student list, before and after the fast path.
+
+    python benchmarks/serialization_bench.py --rows 10000
+    DATABASE_URL=postgresql://... python benchmarks/serialization_bench.py --reset
+
+"before" is what /students/ used to do: load Student objects, validate each
+through schemas.Student (FastAPI's serialize_response) and render with the
+stdlib json encoder. "after" selects STUDENT_COLUMNS tuples and encodes them
+with orjson, with and without VALIDATE_RESPONSES. Serialization is timed alone
+and together with the query. The schema is migrated to head first. Without
+DATABASE_URL a throwaway SQLite file is used; with it, all of its tables are
+dropped, so --reset is required.
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+from os.path import dirname
+from typing import List
+
+sys.path.append(dirname(dirname(os.path.abspath(__file__))))
+
+from bench_db import add_reset_argument, reset_schema, use_database
+
+
+def timed(fn, rounds):
+    samples = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--rounds", type=int, default=20)
+    add_reset_argument(parser)
+    args = parser.parse_args()
+    use_database(args, "serialization_bench")
+
+    from fastapi.responses import JSONResponse
+    from fastapi.routing import serialize_response
+    from fastapi.utils import create_response_field
+
+    import seed
+    from app import models, schemas, serialization
+    from app.database import SessionLocal, engine
+
+    field = create_response_field(name="response", type_=List[schemas.Student])
+
+    def fastapi_json(students):
+        content = asyncio.run(serialize_response(field=field, response_content=students))
+        return JSONResponse(content).body
+
+    def orjson_rows(rows, validate=False):
+        serialization.VALIDATE_RESPONSES = validate
+        return serialization.encode_rows(rows, models.STUDENT_FIELDS, schemas.Student)
+
+    reset_schema()
+    db = SessionLocal()
+    try:
+        seed.seed_synthetic(db, args.rows, 10, 0)
+
+        def load_objects():
+            # A fresh identity map each time, as in a request's own session
+            db.expunge_all()
+            return db.query(models.Student).order_by(models.Student.id).limit(args.rows).all()
+
+        def load_rows():
+            return db.query(*models.STUDENT_COLUMNS).order_by(models.Student.id).limit(args.rows).all()
+
+        students, rows = load_objects(), load_rows()
+        if json.loads(fastapi_json(students)) != json.loads(orjson_rows(rows)):
+            raise RuntimeError("fast path output differs")
+
+        results = {
+            "before: pydantic + json": timed(lambda: fastapi_json(students), args.rounds),
+            "after: tuples + orjson": timed(lambda: orjson_rows(rows), args.rounds),
+            "after: validated + orjson": timed(lambda: orjson_rows(rows, validate=True), args.rounds),
+            "before: query + serialize": timed(lambda: fastapi_json(load_objects()), args.rounds),
+            "after: query + serialize": timed(lambda: orjson_rows(load_rows()), args.rounds),
+        }
+    finally:
+        db.close()
+
+    print(f"\n{len(rows)} rows ({engine.dialect.name})")
+    print(f"{'path':<30}{'p50 ms':>10}{'us/row':>10}")
+    for name, seconds in results.items():
+        print(f"{name:<30}{seconds * 1000:>10.2f}{seconds * 1e6 / len(rows):>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""Cold start: process spawn to first response, for N uvicorn workers.
+
+    python benchmarks/startup_bench.py --workers 1 2 4 --rounds 3
+    DATABASE_URL=postgresql://... python benchmarks/startup_bench.py
+
+Each round starts `uvicorn app.main:app --workers N` and polls until the first
+/health response (the app is imported and serving), then times the first
+database-backed response (POST /token followed by GET /students/). Also timed
+in fresh interpreters: `import app.main` alone, and the metadata create_all
+that every worker used to run at import, for comparison. Without DATABASE_URL
+a throwaway SQLite database is migrated and seeded first; requires httpx.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from os.path import dirname
+
+import httpx
+
+ROOT = dirname(dirname(os.path.abspath(__file__)))
+
+IMPORT_APP = "import time; t = time.perf_counter(); import app.main; print(time.perf_counter() - t)"
+CREATE_ALL = (
+    "from app import database, models; import time; t = time.perf_counter(); "
+    "models.Base.metadata.create_all(bind=database.engine); print(time.perf_counter() - t)"
+)
+
+
+def timed_python(code, env):
+    output = subprocess.run(
+        [sys.executable, "-c", code], cwd=ROOT, env=env, check=True, capture_output=True, text=True
+    ).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def cold_start(workers, port, env, username, password, timeout=60):
+    base_url = f"http://127.0.0.1:{port}"
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning"],
+        cwd=ROOT, env=env,
+    )
+    try:
+        with httpx.Client(base_url=base_url, timeout=5) as client:
+            while True:
+                if process.poll() is not None:
+                    raise RuntimeError("server exited during startup")
+                if time.perf_counter() - started > timeout:
+                    raise RuntimeError("server did not become ready")
+                try:
+                    if client.get("/health").status_code < 500:
+                        break
+                except httpx.TransportError:
+                    time.sleep(0.01)
+            first_response = time.perf_counter() - started
+
+            token = client.post("/token", data={"username": username, "password": password}).json()["access_token"]
+            response = client.get("/students/", params={"limit": 1}, headers={"Authorization": f"Bearer {token}"})
+            response.raise_for_status()
+            first_db_response = time.perf_counter() - started
+    finally:
+        process.terminate()
+        process.wait()
+    return first_response, first_db_response
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--port", type=int, default=8767)
+    parser.add_argument("--username", default="admin")
+    parser.add_argument("--password", default="admin123")
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    if "DATABASE_URL" not in env:
+        env["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/startup_bench.db"
+        subprocess.run(["alembic", "upgrade", "head"], cwd=ROOT, env=env, check=True, capture_output=True)
+        subprocess.run([sys.executable, "seed.py"], cwd=ROOT, env=env, check=True, capture_output=True)
+
+    report = {
+        "import_app_seconds": statistics.median(timed_python(IMPORT_APP, env) for _ in range(args.rounds)),
+        "create_all_seconds": statistics.median(timed_python(CREATE_ALL, env) for _ in range(args.rounds)),
+        "cold_start": {},
+    }
+    for workers in args.workers:
+        rounds = [cold_start(workers, args.port, env, args.username, args.password) for _ in range(args.rounds)]
+        report["cold_start"][f"{workers}_workers"] = {
+            "first_response_seconds": round(statistics.median(first for first, _ in rounds), 3),
+            "first_db_response_seconds": round(statistics.median(db for _, db in rounds), 3),
+        }
+    report["import_app_seconds"] = round(report["import_app_seconds"], 3)
+    report["create_all_seconds"] = round(report["create_all_seconds"], 3)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
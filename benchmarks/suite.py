@@ -0,0 +1,393 @@
+"""Per-route benchmark suite with baseline regression checks.
+
+    python benchmarks/suite.py --sizes 10000 100000 --output results.json
+    python benchmarks/suite.py --sizes 10000 --save-baseline benchmarks/baselines/sqlite.json
+    python benchmarks/suite.py --sizes 10000 --baseline benchmarks/baselines/sqlite.json --threshold 20
+    DATABASE_URL=postgresql://... python benchmarks/suite.py --sizes 1000000 --async-db
+
+Each size runs in its own process against a freshly migrated database,
+seeded like `seed.py --students N` (N x --per-student enrollments). With
+DATABASE_URL set, all of its tables are dropped first; without it a
+throwaway SQLite file is used. Every API route is then driven on its own, with
+--concurrency workers, through an in-process ASGI client and through a uvicorn
+server over HTTP, using the load generator in load_test.py. Throughput and
+p50/p95/p99 latency per route are reported as JSON.
+
+Job routes run with JOB_WORKERS=0 unless it is set: submissions are timed up to
+the queue, and reads, results and cancels use jobs created for the run. POST
+/analytics/refresh rebuilds whole tables, so it is driven one request at a time.
+
+With --baseline, the run fails when a route's --metric exceeds the baseline by
+more than --threshold percent (and by at least --min-delta-ms), or when a
+route returns errors. PUT /users/me/password is left out: it revokes the token
+the run uses. Requires httpx.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from os.path import dirname
+
+import httpx
+
+from load_test import get_token, run_load, wait_until_ready
+
+ROOT = dirname(dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# (name, method, path) -- placeholders are filled by Workload.render
+ROUTES = [
+    ("token", "POST", "/token"),
+    ("create_student", "POST", "/students/"),
+    ("import_students", "POST", "/students/import?format=csv"),
+    ("list_students", "GET", "/students/?limit=100"),
+    ("list_by_department", "GET", "/students/?limit=100&department={department}"),
+    ("export_students_ndjson", "GET", "/students/?limit=1000&format=ndjson"),
+    ("read_student", "GET", "/students/{student_id}"),
+    ("update_student", "PUT", "/students/{disposable_id}"),
+    ("delete_student", "DELETE", "/students/{disposable_id}"),
+    ("student_schedule", "GET", "/students/{student_id}/schedule"),
+    ("create_enrollment", "POST", "/enrollments/"),
+    ("create_enrollments_batch", "POST", "/enrollments/batch"),
+    ("import_enrollments", "POST", "/enrollments/import?format=csv"),
+    ("course_students", "GET", "/courses/{course_id}/students?limit=100"),
+    ("course_roster", "GET", "/courses/{course_id}/roster"),
+    ("search", "GET", "/search/students?q={query}"),
+    ("analytics_course_enrollments", "GET", "/analytics/course-enrollments?limit=100"),
+    ("analytics_credit_loads", "GET", "/analytics/credit-loads?limit=100&semester={semester}"),
+    ("analytics_departments", "GET", "/analytics/departments"),
+    ("analytics_refresh", "POST", "/analytics/refresh"),
+    ("submit_import_job", "POST", "/jobs/imports/students?format=csv"),
+    ("submit_report_job", "POST", "/jobs/reports"),
+    ("submit_rollover_job", "POST", "/jobs/rollovers"),
+    ("list_jobs", "GET", "/jobs/?limit=50"),
+    ("read_job", "GET", "/jobs/{job_id}"),
+    ("job_result", "GET", "/jobs/{job_id}/result"),
+    ("cancel_job", "POST", "/jobs/{cancellable_job_id}/cancel"),
+    ("health", "GET", "/health"),
+    ("metrics_cache", "GET", "/metrics/cache"),
+    ("metrics_auth", "GET", "/metrics/auth"),
+    ("metrics_pool", "GET", "/metrics/pool"),
+    ("metrics_jobs", "GET", "/metrics/jobs"),
+    ("metrics", "GET", "/metrics"),
+]
+# Routes that would only measure lock waits when run concurrently
+SERIAL_ROUTES = {"analytics_refresh"}
+CLIENTS = ("in_process", "external")
+IMPORT_ROWS = 100
+SEARCH_QUERIES = ["tha", "smith", "maya", "physics", "gurung.1"]
+
+
+class Workload:
+    """Path parameters and request bodies for ROUTES, drawn from the seeded data.
+
+    `tag` keeps the emails and semesters written by one client's run apart
+    from every other run's, so writes never collide with earlier ones.
+    """
+
+    def __init__(self, tag, student_ids, course_ids, disposable_ids, job_ids, cancellable_job_ids, credentials):
+        import seed
+
+        self.tag = tag
+        self.student_ids = student_ids
+        self.course_ids = course_ids
+        self.departments = seed.DEPARTMENTS
+        self.semesters = seed.SEMESTERS
+        self.credentials = credentials
+        # Half the disposable students are updated, the other half deleted once each
+        self.updatable = disposable_ids[::2]
+        self.deletable = disposable_ids[1::2]
+        self.job_ids = job_ids
+        self.cancellable_job_ids = cancellable_job_ids
+        self.counter = itertools.count()
+
+    def render(self, name, path, rng):
+        n = next(self.counter)
+        disposable_id = cancellable_job_id = None
+        if name == "update_student":
+            disposable_id = rng.choice(self.updatable)
+        elif name == "delete_student":
+            disposable_id = self.deletable.pop()
+        elif name == "cancel_job":
+            cancellable_job_id = self.cancellable_job_ids.pop()
+        url = path.format(
+            student_id=rng.choice(self.student_ids),
+            course_id=rng.choice(self.course_ids),
+            department=rng.choice(self.departments),
+            semester=rng.choice(self.semesters),
+            query=rng.choice(SEARCH_QUERIES),
+            disposable_id=disposable_id,
+            job_id=rng.choice(self.job_ids),
+            cancellable_job_id=cancellable_job_id,
+        )
+        semester = f"Suite {self.tag} {n}"
+
+        if name == "token":
+            return url, {"data": self.credentials}
+        if name == "create_student":
+            return url, {"json": self.student(f"{n}", rng)}
+        if name == "update_student":
+            return url, {"json": self.student(f"disposable-{disposable_id}", rng)}
+        if name in ("import_students", "submit_import_job"):
+            rows = (self.student(f"{n}-{i}", rng) for i in range(IMPORT_ROWS))
+            body = "name,email,department\n" + "".join(
+                f"{row['name']},{row['email']},{row['department']}\n" for row in rows
+            )
+            return url, {"content": body}
+        if name == "create_enrollment":
+            return url, {"json": {
+                "student_id": rng.choice(self.student_ids), "course_id": rng.choice(self.course_ids),
+                "semester": semester,
+            }}
+        if name == "create_enrollments_batch":
+            return url, {"json": {
+                "student_ids": rng.sample(self.student_ids, min(10, len(self.student_ids))),
+                "course_ids": rng.sample(self.course_ids, min(3, len(self.course_ids))),
+                "semester": semester,
+            }}
+        if name == "import_enrollments":
+            students = rng.sample(self.student_ids, min(IMPORT_ROWS, len(self.student_ids)))
+            body = "student_id,course_id,semester\n" + "".join(
+                f"{student_id},{rng.choice(self.course_ids)},{semester}\n" for student_id in students
+            )
+            return url, {"content": body}
+        if name == "submit_report_job":
+            return url, {"json": {"report": "credit-loads", "semester": rng.choice(self.semesters)}}
+        if name == "submit_rollover_job":
+            return url, {"json": {"from_semester": rng.choice(self.semesters), "to_semester": semester}}
+        return url, {}
+
+    def student(self, key, rng):
+        return {
+            "name": f"Suite Student {key}",
+            "email": f"suite.{self.tag}.{key}@bench.college.edu",
+            "department": rng.choice(self.departments),
+        }
+
+
+def prepare_database(size, args):
+    """Drop everything, migrate to head and seed; returns the seeding stats."""
+    from alembic import command
+    from alembic.config import Config
+    from sqlalchemy import func, select, text
+
+    import seed
+    from app import models
+    from app.database import SessionLocal, engine
+
+    models.Base.metadata.drop_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(text("DROP TABLE IF EXISTS alembic_version"))
+    command.upgrade(Config(os.path.join(ROOT, "alembic.ini")), "head")
+
+    started = time.perf_counter()
+    with SessionLocal() as db:
+        seed.seed_defaults(db)
+        seed.seed_synthetic(db, size, args.courses, args.per_student)
+        enrollments = db.scalar(select(func.count()).select_from(models.Enrollment))
+    return {"students": size, "enrollments": enrollments, "seed_seconds": round(time.perf_counter() - started, 1)}
+
+
+def make_workload(tag, args):
+    from sqlalchemy import insert, select
+
+    from app import models
+    from app.database import SessionLocal
+
+    disposable = 2 * (args.requests + args.warmup)
+    with SessionLocal() as db:
+        student_ids = list(db.scalars(select(models.Student.id)))
+        course_ids = list(db.scalars(select(models.Course.id)))
+        disposable_ids = list(db.scalars(insert(models.Student).returning(models.Student.id), [
+            {"name": f"Disposable {i}", "email": f"disposable.{tag}.{i}@bench.college.edu", "department": "Physics"}
+            for i in range(disposable)
+        ]))
+        # Finished jobs to read, and queued ones to cancel once each
+        job = {"kind": "rollover", "params": {"from_semester": "-", "to_semester": tag}, "submitted_by": "suite"}
+        job_ids = list(db.scalars(insert(models.Job).returning(models.Job.id), [
+            {**job, "status": "succeeded", "result": {"students": 0, "enrollments_created": 0}} for _ in range(20)
+        ]))
+        cancellable_job_ids = list(db.scalars(insert(models.Job).returning(models.Job.id), [
+            {**job, "status": "queued"} for _ in range(args.requests + args.warmup)
+        ]))
+        db.commit()
+    credentials = {"username": args.username, "password": args.password}
+    return Workload(tag, student_ids, course_ids, disposable_ids, job_ids, cancellable_job_ids, credentials)
+
+
+async def measure(client, workload, args):
+    client.headers["Authorization"] = f"Bearer {await get_token(client, args.username, args.password)}"
+    results = {}
+    for route in ROUTES:
+        name = route[0]
+        if args.routes and name not in args.routes:
+            continue
+        load = (client, [route], 1 if name in SERIAL_ROUTES else args.concurrency)
+        ids = (workload.student_ids, workload.course_ids)
+        await run_load(*load, args.warmup, *ids, render=workload.render)
+        results[name] = (await run_load(*load, args.requests, *ids, render=workload.render))[name]
+    return results
+
+
+async def measure_in_process(workload, args):
+    from app.main import app
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://suite", timeout=120) as client:
+        return await measure(client, workload, args)
+
+
+async def measure_external(base_url, workload, args):
+    limits = httpx.Limits(max_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=120) as client:
+        return await measure(client, workload, args)
+
+
+def run_size(args):
+    """One size, in this (child) process: DATABASE_URL and ASYNC_DB are already set."""
+    report = prepare_database(args.run_size, args)
+    if "in_process" in args.clients:
+        workload = make_workload(f"{int(time.time())}i", args)
+        report["in_process"] = asyncio.run(measure_in_process(workload, args))
+    if "external" in args.clients:
+        workload = make_workload(f"{int(time.time())}e", args)
+        base_url = f"http://127.0.0.1:{args.port}"
+        process = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(args.port),
+             "--workers", str(args.workers), "--log-level", "warning"],
+            cwd=ROOT,
+        )
+        try:
+            wait_until_ready(base_url, process)
+            report["external"] = asyncio.run(measure_external(base_url, workload, args))
+        finally:
+            process.terminate()
+            process.wait()
+    with open(args.result_file, "w") as out:
+        json.dump(report, out)
+
+
+def environment(args, database_url):
+    from sqlalchemy.engine import make_url
+
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True
+        ).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        "database": make_url(database_url).get_backend_name() if database_url else "sqlite",
+        "async_db": args.async_db,
+        "concurrency": args.concurrency,
+        "requests_per_route": args.requests,
+        "uvicorn_workers": args.workers,
+        "per_student": args.per_student,
+        "courses": args.courses,
+        "python": platform.python_version(),
+        "commit": commit,
+    }
+
+
+# Settings that make two runs comparable
+COMPARABLE = ("database", "async_db", "concurrency", "requests_per_route", "uvicorn_workers", "per_student", "courses")
+
+
+def compare(report, baseline, metric, threshold, min_delta_ms):
+    """Failure messages: routes with errors, and routes slower than the baseline allows."""
+    failures = []
+    for size, results in report["sizes"].items():
+        for client in CLIENTS:
+            for route, current in results.get(client, {}).items():
+                if current["errors"]:
+                    failures.append(f"{size} {client} {route}: {current['errors']} errors")
+                previous = baseline.get("sizes", {}).get(size, {}).get(client, {}).get(route)
+                if not previous or previous.get(metric) is None or current.get(metric) is None:
+                    continue
+                allowed = previous[metric] * (1 + threshold / 100)
+                if current[metric] > allowed and current[metric] - previous[metric] >= min_delta_ms:
+                    failures.append(
+                        f"{size} {client} {route}: {metric} {previous[metric]} -> {current[metric]} ms "
+                        f"(+{(current[metric] / previous[metric] - 1) * 100:.0f}%)"
+                    )
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000], help="students per run")
+    parser.add_argument("--per-student", type=int, default=4, help="enrollments per student")
+    parser.add_argument("--courses", type=int, default=50)
+    parser.add_argument("--clients", nargs="+", choices=CLIENTS, default=list(CLIENTS))
+    parser.add_argument("--routes", nargs="+", help="only these route names")
+    parser.add_argument("--requests", type=int, default=200, help="measured requests per route")
+    parser.add_argument("--warmup", type=int, default=20, help="unmeasured requests per route first")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers for the external client")
+    parser.add_argument("--async-db", action="store_true", help="run with ASYNC_DB=1")
+    parser.add_argument("--port", type=int, default=8768)
+    parser.add_argument("--output", help="also write the JSON report here")
+    parser.add_argument("--baseline", help="fail on regressions against this report")
+    parser.add_argument("--save-baseline", help="write this run's report as a baseline")
+    parser.add_argument("--metric", choices=["p50_ms", "p95_ms", "p99_ms"], default="p95_ms")
+    parser.add_argument("--threshold", type=float, default=20.0, help="allowed slowdown, percent")
+    parser.add_argument("--min-delta-ms", type=float, default=1.0, help="ignore smaller absolute slowdowns")
+    parser.add_argument("--username", default="admin")
+    parser.add_argument("--password", default="admin123")
+    parser.add_argument("--run-size", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--result-file", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_size:
+        run_size(args)
+        return
+
+    env = dict(os.environ, ASYNC_DB="1" if args.async_db else "0")
+    env.setdefault("JOB_WORKERS", "0")
+    workdir = tempfile.mkdtemp()
+    env.setdefault("JOB_SPOOL_DIR", os.path.join(workdir, "job_spool"))
+    report = {"environment": environment(args, os.environ.get("DATABASE_URL")), "sizes": {}}
+    for size in args.sizes:
+        size_env = dict(env)
+        size_env.setdefault("DATABASE_URL", f"sqlite:///{workdir}/suite_{size}.db")
+        result_file = os.path.join(workdir, f"{size}.json")
+        subprocess.run(
+            [sys.executable, os.path.abspath(__file__), *sys.argv[1:],
+             "--run-size", str(size), "--result-file", result_file],
+            cwd=ROOT, env=size_env, check=True,
+        )
+        with open(result_file) as result:
+            report["sizes"][str(size)] = json.load(result)
+
+    print(json.dumps(report, indent=2))
+    for path in (args.output, args.save_baseline):
+        if path:
+            os.makedirs(dirname(os.path.abspath(path)), exist_ok=True)
+            with open(path, "w") as out:
+                json.dump(report, out, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as source:
+            baseline = json.load(source)
+        mismatched = [
+            key for key in COMPARABLE if baseline.get("environment", {}).get(key) != report["environment"][key]
+        ]
+        if mismatched:
+            sys.exit(f"baseline was recorded with different settings: {', '.join(mismatched)}")
+        failures = compare(report, baseline, args.metric, args.threshold, args.min_delta_ms)
+        for failure in failures:
+            print(f"REGRESSION {failure}", file=sys.stderr)
+        if failures:
+            sys.exit(1)
+        print(f"no regressions against {args.baseline} ({args.metric}, {args.threshold:g}% threshold)",
+              file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
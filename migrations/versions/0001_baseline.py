@@ -0,0 +1,71 @@
+"""Baseline: the tables the app used to create with create_all at startup
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18
+
+Databases created that way already have these tables, so each one is only
+created when missing; `alembic upgrade head` works on new and old databases.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    existing = set(sa.inspect(op.get_bind()).get_table_names())
+
+    if "users" not in existing:
+        op.create_table(
+            "users",
+            sa.Column("id", sa.Integer, primary_key=True),
+            sa.Column("username", sa.String),
+            sa.Column("hashed_password", sa.String),
+        )
+        op.create_index("ix_users_id", "users", ["id"])
+        op.create_index("ix_users_username", "users", ["username"], unique=True)
+
+    if "students" not in existing:
+        op.create_table(
+            "students",
+            sa.Column("id", sa.Integer, primary_key=True),
+            sa.Column("name", sa.String),
+            sa.Column("email", sa.String),
+            sa.Column("department", sa.String),
+        )
+        op.create_index("ix_students_id", "students", ["id"])
+        op.create_index("ix_students_name", "students", ["name"])
+        op.create_index("ix_students_email", "students", ["email"], unique=True)
+
+    if "courses" not in existing:
+        op.create_table(
+            "courses",
+            sa.Column("id", sa.Integer, primary_key=True),
+            sa.Column("name", sa.String),
+            sa.Column("code", sa.String),
+            sa.Column("credits", sa.Integer),
+        )
+        op.create_index("ix_courses_id", "courses", ["id"])
+        op.create_index("ix_courses_name", "courses", ["name"])
+        op.create_index("ix_courses_code", "courses", ["code"], unique=True)
+
+    if "enrollments" not in existing:
+        op.create_table(
+            "enrollments",
+            sa.Column("id", sa.Integer, primary_key=True),
+            sa.Column("student_id", sa.Integer, sa.ForeignKey("students.id")),
+            sa.Column("course_id", sa.Integer, sa.ForeignKey("courses.id")),
+            sa.Column("semester", sa.String),
+        )
+        op.create_index("ix_enrollments_id", "enrollments", ["id"])
+
+
+def downgrade() -> None:
+    for table in ("enrollments", "courses", "students", "users"):
+        op.drop_table(table)
@@ -0,0 +1,118 @@
+"""Query indexes, enrollment uniqueness, analytics summaries and the jobs table
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+
+Everything the models gained after the baseline. Each step checks the live
+schema first, because databases that ran the app before migrations existed
+may already have some of it from create_all.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+SEARCH_FIELDS = ("name", "email", "department")
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    tables = set(inspector.get_table_names())
+
+    def indexes(table):
+        return {index["name"] for index in inspector.get_indexes(table)}
+
+    if "ix_students_department_id" not in indexes("students"):
+        op.create_index("ix_students_department_id", "students", ["department", "id"])
+
+    unique = {constraint["name"] for constraint in inspector.get_unique_constraints("enrollments")}
+    if "uq_enrollments_student_course_semester" not in unique:
+        # Keep the first of any duplicates the old check-then-insert let through
+        op.execute(
+            "DELETE FROM enrollments WHERE id NOT IN "
+            "(SELECT MIN(id) FROM enrollments GROUP BY student_id, course_id, semester)"
+        )
+        with op.batch_alter_table("enrollments") as batch:
+            batch.create_unique_constraint(
+                "uq_enrollments_student_course_semester", ["student_id", "course_id", "semester"]
+            )
+    if "ix_enrollments_course_semester_student" not in indexes("enrollments"):
+        op.create_index(
+            "ix_enrollments_course_semester_student", "enrollments", ["course_id", "semester", "student_id"]
+        )
+
+    if "course_semester_stats" not in tables:
+        op.create_table(
+            "course_semester_stats",
+            sa.Column("course_id", sa.Integer, sa.ForeignKey("courses.id"), primary_key=True),
+            sa.Column("semester", sa.String, primary_key=True),
+            sa.Column("enrollment_count", sa.Integer, nullable=False),
+        )
+        op.execute(
+            "INSERT INTO course_semester_stats (course_id, semester, enrollment_count) "
+            "SELECT course_id, semester, COUNT(*) FROM enrollments GROUP BY course_id, semester"
+        )
+    if "student_credit_loads" not in tables:
+        op.create_table(
+            "student_credit_loads",
+            sa.Column("student_id", sa.Integer, sa.ForeignKey("students.id"), primary_key=True),
+            sa.Column("semester", sa.String, primary_key=True),
+            sa.Column("course_count", sa.Integer, nullable=False),
+            sa.Column("credits", sa.Integer, nullable=False),
+        )
+        op.create_index("ix_student_credit_loads_semester_student", "student_credit_loads", ["semester", "student_id"])
+        op.execute(
+            "INSERT INTO student_credit_loads (student_id, semester, course_count, credits) "
+            "SELECT e.student_id, e.semester, COUNT(*), COALESCE(SUM(c.credits), 0) "
+            "FROM enrollments e JOIN courses c ON c.id = e.course_id GROUP BY e.student_id, e.semester"
+        )
+
+    if "jobs" not in tables:
+        op.create_table(
+            "jobs",
+            sa.Column("id", sa.Integer, primary_key=True),
+            sa.Column("kind", sa.String, nullable=False),
+            sa.Column("status", sa.String, nullable=False),
+            sa.Column("params", sa.JSON, nullable=False),
+            sa.Column("progress", sa.Integer, nullable=False),
+            sa.Column("total", sa.Integer),
+            sa.Column("checkpoint", sa.JSON),
+            sa.Column("result", sa.JSON),
+            sa.Column("error", sa.Text),
+            sa.Column("cancel_requested", sa.Boolean, nullable=False),
+            sa.Column("submitted_by", sa.String),
+            sa.Column("worker", sa.String),
+            sa.Column("created_at", sa.DateTime, nullable=False),
+            sa.Column("started_at", sa.DateTime),
+            sa.Column("finished_at", sa.DateTime),
+            sa.Column("heartbeat_at", sa.DateTime),
+        )
+        op.create_index("ix_jobs_status_id", "jobs", ["status", "id"])
+
+    if bind.dialect.name == "postgresql":
+        # Trigram indexes behind /search/students
+        op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        for field in SEARCH_FIELDS:
+            op.execute(
+                f"CREATE INDEX IF NOT EXISTS ix_students_{field}_trgm ON students USING gin ({field} gin_trgm_ops)"
+            )
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == "postgresql":
+        for field in SEARCH_FIELDS:
+            op.execute(f"DROP INDEX IF EXISTS ix_students_{field}_trgm")
+    op.drop_table("jobs")
+    op.drop_table("student_credit_loads")
+    op.drop_table("course_semester_stats")
+    op.drop_index("ix_enrollments_course_semester_student", table_name="enrollments")
+    with op.batch_alter_table("enrollments") as batch:
+        batch.drop_constraint("uq_enrollments_student_course_semester", type_="unique")
+    op.drop_index("ix_students_department_id", table_name="students")
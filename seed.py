@@ -1,54 +1,135 @@
+import argparse
+import random
 import sys
 from os.path import dirname, join
 sys.path.append(dirname(dirname(__file__)))
 
-from app.database import SessionLocal
+from sqlalchemy import select
+
+from app.analytics import record_enrollments
+from app.bulk import EnrollmentImporter, StudentImporter
+from app.database import SessionLocal, insert_for
 from app.models import User, Student, Course, Enrollment
 from app.auth import get_password_hash
-db = SessionLocal()
 
-# Create admin user
-if not db.query(User).filter(User.username == "admin").first():
-    db.add(User(
-        username="admin",
-        hashed_password=get_password_hash("admin123")
-    ))
+FIRST_NAMES = ["Astha", "Jane", "Ram", "Sita", "Arjun", "Maya", "John", "Priya", "Bikash", "Laura",
+               "Nabin", "Emma", "Kiran", "Olivia", "Suman", "Noah", "Anita", "Liam", "Rohan", "Sara"]
+LAST_NAMES = ["Thapa", "Smith", "Shrestha", "Gurung", "Sharma", "Brown", "Rai", "Johnson", "Karki",
+              "Williams", "Adhikari", "Jones", "Tamang", "Garcia", "Basnet", "Miller", "Magar", "Davis"]
+DEPARTMENTS = ["Computer Science", "Mathematics", "Physics", "Chemistry", "Civil Engineering",
+               "Electrical Engineering", "Software Engineering", "Economics", "Biology", "English"]
+SEMESTERS = ["Fall 2023", "Spring 2024", "Fall 2024"]
+
 
-# Create sample students
-students = [
+DEFAULT_STUDENTS = [
     {"name": "Astha Thapa", "email": "astha@college.edu", "department": "Computer Science"},
-    {"name": "Jane Smith", "email": "jane@college.edu", "department": "Mathematics"}
+    {"name": "Jane Smith", "email": "jane@college.edu", "department": "Mathematics"},
 ]
-
-for student in students:
-    if not db.query(Student).filter(Student.email == student["email"]).first():
-        db.add(Student(**student))
-
-# Create sample courses
-courses = [
+DEFAULT_COURSES = [
     {"name": "Advanced Programming", "code": "CS501", "credits": 4},
-    {"name": "Database Systems", "code": "CS502", "credits": 3}
+    {"name": "Database Systems", "code": "CS502", "credits": 3},
+]
+# (student email, course code, semester)
+DEFAULT_ENROLLMENTS = [
+    ("astha@college.edu", "CS501", "Fall 2023"),
+    ("jane@college.edu", "CS502", "Fall 2023"),
 ]
 
-for course in courses:
-    if not db.query(Course).filter(Course.code == course["code"]).first():
-        db.add(Course(**course))
 
-db.commit()
+def seed_defaults(db):
+    """Idempotent: one INSERT ... ON CONFLICT DO NOTHING per table, safe to run on every deploy."""
+    insert = insert_for(db)
+
+    # Hash only when the admin is missing; bcrypt is the slowest part of a re-run
+    if db.scalar(select(User.id).where(User.username == "admin")) is None:
+        db.execute(insert(User).on_conflict_do_nothing(), [
+            {"username": "admin", "hashed_password": get_password_hash("admin123")}
+        ])
+    db.execute(insert(Student).on_conflict_do_nothing(), DEFAULT_STUDENTS)
+    db.execute(insert(Course).on_conflict_do_nothing(), DEFAULT_COURSES)
+
+    emails = {email for email, _, _ in DEFAULT_ENROLLMENTS}
+    codes = {code for _, code, _ in DEFAULT_ENROLLMENTS}
+    student_ids = dict(db.execute(select(Student.email, Student.id).where(Student.email.in_(emails))).all())
+    course_ids = dict(db.execute(select(Course.code, Course.id).where(Course.code.in_(codes))).all())
+    created = db.execute(
+        insert(Enrollment).on_conflict_do_nothing().returning(
+            Enrollment.student_id, Enrollment.course_id, Enrollment.semester
+        ),
+        [
+            {"student_id": student_ids[email], "course_id": course_ids[code], "semester": semester}
+            for email, code, semester in DEFAULT_ENROLLMENTS
+        ],
+    ).all()
+    record_enrollments(db, [row._mapping for row in created])
+    db.commit()
+
+
+# Synthetic dataset, loaded through the same bulk import path as the API
+def generate_students(count, rng):
+    for i in range(count):
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        yield {
+            "name": f"{first} {last}",
+            "email": f"{first.lower()}.{last.lower()}.{i}@synthetic.college.edu",
+            "department": rng.choice(DEPARTMENTS),
+        }
+
+
+def generate_courses(count):
+    return [
+        {"name": f"{DEPARTMENTS[i % len(DEPARTMENTS)]} {100 + i}", "code": f"SYN{i:04d}", "credits": 2 + i % 3}
+        for i in range(count)
+    ]
+
+
+def generate_enrollments(student_ids, course_ids, per_student, rng):
+    per_student = min(per_student, len(course_ids))
+    for student_id in student_ids:
+        semester = rng.choice(SEMESTERS)
+        for course_id in rng.sample(course_ids, per_student):
+            yield {"student_id": student_id, "course_id": course_id, "semester": semester}
+
+
+def seed_synthetic(db, students, courses, enrollments_per_student, batch_size=None, seed=42):
+    rng = random.Random(seed)
+    kwargs = {"batch_size": batch_size} if batch_size else {}
+
+    if courses:
+        db.execute(insert_for(db)(Course).on_conflict_do_nothing(), generate_courses(courses))
+        db.commit()
+
+    student_report = StudentImporter(db, **kwargs).load(generate_students(students, rng))
+    print(f"students: {student_report.inserted} inserted, {student_report.rejected} rejected, "
+          f"{student_report.rows_per_second} rows/s")
+
+    if enrollments_per_student:
+        course_ids = list(db.scalars(select(Course.id).where(Course.code.like("SYN%"))))
+        # Materialized up front: the importer commits per batch, which would close a streaming cursor
+        student_ids = list(db.scalars(
+            select(Student.id).where(Student.email.like("%@synthetic.college.edu"))
+        ))
+        enrollment_report = EnrollmentImporter(db, **kwargs).load(
+            generate_enrollments(student_ids, course_ids, enrollments_per_student, rng)
+        )
+        print(f"enrollments: {enrollment_report.inserted} inserted, {enrollment_report.rejected} rejected, "
+              f"{enrollment_report.rows_per_second} rows/s")
 
-# Create enrollments
-enrollments = [
-    {"student_id": 1, "course_id": 1, "semester": "Fall 2023"},
-    {"student_id": 2, "course_id": 2, "semester": "Fall 2023"}
-]
 
-for enrollment in enrollments:
-    if not db.query(Enrollment).filter(
-        Enrollment.student_id == enrollment["student_id"],
-        Enrollment.course_id == enrollment["course_id"],
-        Enrollment.semester == enrollment["semester"]
-    ).first():
-        db.add(Enrollment(**enrollment))
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Seed the college database")
+    parser.add_argument("--students", type=int, default=0, help="synthetic students to generate")
+    parser.add_argument("--courses", type=int, default=50, help="synthetic courses to generate")
+    parser.add_argument("--enrollments-per-student", type=int, default=4)
+    parser.add_argument("--batch-size", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=42, help="random seed for reproducible data")
+    args = parser.parse_args()
 
-db.commit()
-db.close()
\ No newline at end of file
+    db = SessionLocal()
+    try:
+        seed_defaults(db)
+        if args.students:
+            seed_synthetic(db, args.students, args.courses, args.enrollments_per_student,
+                           args.batch_size, args.seed)
+    finally:
+        db.close()
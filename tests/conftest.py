@@ -0,0 +1,32 @@
+import os
+import tempfile
+
+# Settings are read at import time, so point the app at a throwaway database first
+_workdir = tempfile.mkdtemp(prefix="college-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_workdir}/test.db"
+os.environ["JOB_SPOOL_DIR"] = os.path.join(_workdir, "job_spool")
+os.environ["JOB_WORKERS"] = "0"
+
+import pytest
+from fastapi.testclient import TestClient
+
+import seed
+from app import init_db
+from app.database import SessionLocal
+
+
+@pytest.fixture(scope="session")
+def client():
+    from app.main import app
+
+    init_db()
+    with SessionLocal() as db:
+        seed.seed_defaults(db)
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture(scope="session")
+def auth_headers(client):
+    response = client.post("/token", data={"username": "admin", "password": "admin123"})
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
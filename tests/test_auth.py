@@ -0,0 +1,98 @@
+import ipaddress
+
+import pytest
+from fastapi import HTTPException
+from starlette.requests import Request
+
+from app import auth, models
+from app.cache import TTLCache
+from app.database import SessionLocal
+
+
+def test_authenticated_requests_work_with_the_auth_cache_disabled(client, auth_headers, monkeypatch):
+    # AUTH_CACHE_TTL=0 (or AUTH_CACHE_SIZE=0): nothing is ever stored
+    monkeypatch.setattr(auth, "_token_cache", TTLCache(auth.AUTH_CACHE_SIZE, 0))
+    monkeypatch.setattr(auth, "_user_cache", TTLCache(auth.AUTH_CACHE_SIZE, 0))
+
+    for _ in range(2):
+        response = client.get("/students/", params={"limit": 1}, headers=auth_headers)
+        assert response.status_code == 200
+    assert len(auth._user_cache) == 0
+
+
+def test_unknown_user_is_rejected_with_the_auth_cache_disabled(client, monkeypatch):
+    monkeypatch.setattr(auth, "_user_cache", TTLCache(0, 60))
+    token = auth.create_access_token({"sub": "nobody", "pv": "x"})
+    response = client.get("/students/", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 401
+
+
+def test_failed_logins_only_lock_out_the_client_that_made_them(monkeypatch):
+    monkeypatch.setattr(auth, "ip_limiter", auth.RateLimiter(1000, 60))
+    monkeypatch.setattr(auth, "username_limiter", auth.RateLimiter(5, 60))
+    for _ in range(5):
+        auth.enforce_login_rate("admin", "10.0.0.1")
+        auth.record_login_failure("admin", "10.0.0.1")
+
+    with pytest.raises(HTTPException) as blocked:
+        auth.enforce_login_rate("admin", "10.0.0.1")
+    assert blocked.value.status_code == 429
+    # The owner, from another address, is unaffected
+    auth.enforce_login_rate("admin", "10.0.0.2")
+
+
+def test_only_failed_logins_count_per_ip(client, monkeypatch):
+    monkeypatch.setattr(auth, "ip_limiter", auth.RateLimiter(3, 60))
+    monkeypatch.setattr(auth, "username_limiter", auth.RateLimiter(1000, 60))
+    for _ in range(5):
+        response = client.post("/token", data={"username": "admin", "password": "admin123"})
+        assert response.status_code == 200
+
+    for username in ("a", "b", "c"):
+        response = client.post("/token", data={"username": username, "password": "wrong"})
+        assert response.status_code == 401
+    response = client.post("/token", data={"username": "admin", "password": "admin123"})
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) >= 1
+
+
+def _request(client_host, forwarded_for=None):
+    headers = [(b"x-forwarded-for", forwarded_for.encode())] if forwarded_for else []
+    return Request({"type": "http", "client": (client_host, 12345), "headers": headers})
+
+
+def test_client_address_trusts_forwarded_for_only_from_trusted_proxies(monkeypatch):
+    monkeypatch.setattr(auth, "TRUSTED_PROXIES", [ipaddress.ip_network("10.0.0.0/8")])
+
+    assert auth.client_address(_request("10.0.0.5", "203.0.113.7, 10.1.2.3")) == "203.0.113.7"
+    # A spoofed leftmost hop is ignored; the last untrusted hop is the client
+    assert auth.client_address(_request("10.0.0.5", "1.2.3.4, 198.51.100.2")) == "198.51.100.2"
+    assert auth.client_address(_request("10.0.0.5")) == "10.0.0.5"
+    # Direct clients cannot pick their own address
+    assert auth.client_address(_request("198.51.100.9", "203.0.113.7")) == "198.51.100.9"
+
+
+def test_change_password(client, monkeypatch):
+    monkeypatch.setattr(auth, "username_limiter", auth.RateLimiter(5, 60))
+    with SessionLocal() as db:
+        db.add(models.User(username="changer", hashed_password=auth.get_password_hash("old-password")))
+        db.commit()
+    token = client.post("/token", data={"username": "changer", "password": "old-password"}).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    hashes_before = auth.hash_pool.hash_latency.snapshot()["count"]
+
+    response = client.put(
+        "/users/me/password", json={"current_password": "wrong", "new_password": "new-password"}, headers=headers
+    )
+    assert response.status_code == 400
+    response = client.put(
+        "/users/me/password", json={"current_password": "old-password", "new_password": "new-password"},
+        headers=headers,
+    )
+    assert response.status_code == 204
+    # Two verifications and one hash, all on the bounded pool
+    assert auth.hash_pool.hash_latency.snapshot()["count"] - hashes_before == 3
+
+    assert client.get("/students/", headers=headers).status_code == 401
+    response = client.post("/token", data={"username": "changer", "password": "new-password"})
+    assert response.status_code == 200
@@ -0,0 +1,55 @@
+from app import bulk, models
+from app.database import SessionLocal
+
+
+def test_csv_import_with_byte_order_mark(client, auth_headers):
+    body = "\ufeffname,email,department\nBom Student,bom@import.test,Physics\n".encode("utf-8")
+    response = client.post("/students/import?format=csv", content=body, headers=auth_headers)
+    assert response.status_code == 200
+    report = response.json()
+    assert (report["inserted"], report["rejected"]) == (1, 0)
+
+
+def test_undecodable_lines_are_reported_not_raised(client, auth_headers):
+    body = (
+        b"name,email,department\n"
+        b"Ana Lopez,ana@import.test,Physics\n"
+        + "José García,jose@import.test,Physics\n".encode("latin-1")
+        + b"Kim Lee,kim@import.test,Physics\n"
+    )
+    response = client.post("/students/import?format=csv", content=body, headers=auth_headers)
+    assert response.status_code == 200
+    report = response.json()
+    assert (report["inserted"], report["rejected"]) == (2, 1)
+    assert report["errors"][0]["line"] == 3
+    assert "Invalid UTF-8" in report["errors"][0]["error"]
+
+
+def test_spooled_upload_decodes_like_a_streamed_one(tmp_path):
+    path = tmp_path / "upload.csv"
+    path.write_bytes(
+        b"\xef\xbb\xbfname,email,department\r\n"
+        + "Zoë Bauer,zoe@import.test,Physics\r\n".encode("latin-1")
+        + b"Kim Lee,kim@import.test,Physics\r\n"
+    )
+    records = list(bulk.iter_file_records(str(path), "csv"))
+    assert records[0][0] == 2 and records[0][1] is None and "Invalid UTF-8" in records[0][2]
+    assert records[1] == (3, {"name": "Kim Lee", "email": "kim@import.test", "department": "Physics"}, None)
+
+
+def test_rows_lost_to_a_concurrent_writer_are_rejected(client):
+    class RacingImporter(bulk.StudentImporter):
+        def resolve(self, valid):
+            resolved = super().resolve(valid)
+            # Another writer registers the first email between the check and the insert
+            self.db.add(models.Student(name="Racer", email="race-1@import.test", department="Physics"))
+            self.db.flush()
+            return resolved
+
+    records = [
+        {"name": f"Student {i}", "email": f"race-{i}@import.test", "department": "Physics"} for i in range(1, 4)
+    ]
+    with SessionLocal() as db:
+        report = RacingImporter(db).load(records)
+    assert (report.received, report.inserted, report.rejected) == (3, 2, 1)
+    assert (report.errors[0].line, report.errors[0].error) == (1, "Conflict with concurrent write")
@@ -0,0 +1,86 @@
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import func, select
+
+from app import models
+from app.database import SessionLocal
+
+
+def _ids():
+    with SessionLocal() as db:
+        student_ids = db.scalars(select(models.Student.id).order_by(models.Student.id).limit(3)).all()
+        course_ids = db.scalars(select(models.Course.id).order_by(models.Course.id).limit(2)).all()
+    return student_ids, course_ids
+
+
+def _count(semester):
+    with SessionLocal() as db:
+        return db.scalar(
+            select(func.count()).select_from(models.Enrollment).where(models.Enrollment.semester == semester)
+        )
+
+
+def test_create_enrollment_status_codes(client, auth_headers):
+    (student_id, *_), (course_id, *_) = _ids()
+    body = {"student_id": student_id, "course_id": course_id, "semester": "Test Single"}
+
+    response = client.post("/enrollments/", json=body, headers=auth_headers)
+    assert response.status_code == 201
+    assert response.json()["student_id"] == student_id
+
+    response = client.post("/enrollments/", json=body, headers=auth_headers)
+    assert (response.status_code, response.json()["detail"]) == (400, "Duplicate enrollment")
+
+    response = client.post("/enrollments/", json={**body, "student_id": 999999}, headers=auth_headers)
+    assert (response.status_code, response.json()["detail"]) == (404, "Student not found")
+
+    response = client.post("/enrollments/", json={**body, "course_id": 999999}, headers=auth_headers)
+    assert (response.status_code, response.json()["detail"]) == (404, "Course not found")
+    assert _count("Test Single") == 1
+
+
+def test_concurrent_identical_enrollments_store_one_row(client, auth_headers):
+    (student_id, *_), (course_id, *_) = _ids()
+    body = {"student_id": student_id, "course_id": course_id, "semester": "Test Race"}
+
+    def create(_):
+        return client.post("/enrollments/", json=body, headers=auth_headers).status_code
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        statuses = Counter(pool.map(create, range(8)))
+
+    assert statuses == Counter({201: 1, 400: 7})
+    assert _count("Test Race") == 1
+
+
+def test_batch_skips_existing_enrollments(client, auth_headers):
+    student_ids, course_ids = _ids()
+    client.post(
+        "/enrollments/", json={"student_id": student_ids[0], "course_id": course_ids[0], "semester": "Test Batch"},
+        headers=auth_headers,
+    )
+
+    response = client.post(
+        "/enrollments/batch", json={"student_ids": student_ids, "course_ids": course_ids, "semester": "Test Batch"},
+        headers=auth_headers,
+    )
+    assert response.status_code == 201
+    result = response.json()
+    pairs = len(student_ids) * len(course_ids)
+    assert (result["requested"], result["created"], result["already_enrolled"]) == (pairs, pairs - 1, 1)
+    assert len(result["enrollments"]) == pairs - 1
+    assert _count("Test Batch") == pairs
+
+
+def test_batch_with_unknown_ids_writes_nothing(client, auth_headers):
+    student_ids, course_ids = _ids()
+    response = client.post(
+        "/enrollments/batch",
+        json={"student_ids": [*student_ids, 999999], "course_ids": [*course_ids, 888888], "semester": "Test Unknown"},
+        headers=auth_headers,
+    )
+    assert response.status_code == 404
+    detail = response.json()["detail"]
+    assert (detail["student_ids"], detail["course_ids"]) == ([999999], [888888])
+    assert _count("Test Unknown") == 0
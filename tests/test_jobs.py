@@ -0,0 +1,74 @@
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import update
+
+from app import jobs, models
+from app.database import SessionLocal
+
+
+def test_report_job_accepts_its_own_filters(client, auth_headers):
+    response = client.post(
+        "/jobs/reports", json={"report": "credit-loads", "semester": "Fall 2024", "department": "Physics"},
+        headers=auth_headers,
+    )
+    assert response.status_code == 202
+    assert response.json()["status"] == "queued"
+
+
+def test_report_job_rejects_filters_of_another_report(client, auth_headers):
+    response = client.post(
+        "/jobs/reports", json={"report": "course-enrollments", "department": "Physics"}, headers=auth_headers
+    )
+    assert response.status_code == 422
+    assert "department" in response.text
+
+    response = client.post("/jobs/reports", json={"report": "credit-loads", "course_id": 1}, headers=auth_headers)
+    assert response.status_code == 422
+
+
+def _running_job(worker):
+    with SessionLocal() as db:
+        job = models.Job(kind="report", params={"report": "credit-loads"}, status=jobs.RUNNING, worker=worker,
+                         heartbeat_at=datetime.utcnow() - timedelta(hours=1))
+        db.add(job)
+        db.commit()
+        return job.id
+
+
+def test_checkpoint_is_fenced_on_the_claim(client):
+    job_id = _running_job("host:1/1")
+    with SessionLocal() as db:
+        ctx = jobs.JobContext(db, db.get(models.Job, job_id), threading.Event())
+        ctx.save({"rows": 1}, 1)
+        db.commit()
+
+        # The stale sweep re-queued it and another process claimed it
+        db.execute(update(jobs.JOBS).where(jobs.JOBS.c.id == job_id).values(worker="host:2/7"))
+        db.commit()
+        with pytest.raises(jobs.JobLost):
+            ctx.save({"rows": 2}, 2)
+        db.rollback()
+        assert db.get(models.Job, job_id).checkpoint == {"rows": 1}
+
+
+def test_heartbeat_refreshes_running_jobs_between_checkpoints(client, monkeypatch):
+    monkeypatch.setattr(jobs, "JOB_STALE_SECONDS", 0.2)
+    runner = jobs.JobRunner(workers=1)
+    runner.Session = SessionLocal
+    job_id = _running_job(f"{runner.worker_id}/1")
+    other_id = _running_job("elsewhere:1/1")
+    runner.running = {job_id: "job-worker-0", other_id: "job-worker-1"}
+
+    thread = threading.Thread(target=runner._heartbeat)
+    thread.start()
+    time.sleep(0.3)
+    runner._stopping.set()
+    thread.join()
+
+    stale = datetime.utcnow() - timedelta(minutes=1)
+    with SessionLocal() as db:
+        assert db.get(models.Job, job_id).heartbeat_at > stale
+        assert db.get(models.Job, other_id).heartbeat_at < stale
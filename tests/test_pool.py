@@ -0,0 +1,30 @@
+import pytest
+from sqlalchemy import create_engine, exc, text
+
+from app.pool import instrument_pool, pool_status
+
+
+def test_checkout_metrics(tmp_path):
+    options = {"pool_size": 1, "max_overflow": 1, "pool_timeout": 0.05}
+    engine = create_engine(f"sqlite:///{tmp_path}/pool.db", **options)
+    instrument_pool(engine, options)
+
+    with engine.connect() as first, engine.connect() as second:
+        first.execute(text("SELECT 1"))
+        second.execute(text("SELECT 1"))
+        status = pool_status(engine)
+        assert (status["checked_out"], status["overflow_events"], status["ready"]) == (2, 1, False)
+        with pytest.raises(exc.TimeoutError):
+            engine.connect()
+
+    status = pool_status(engine)
+    assert (status["acquisitions"], status["timeouts"], status["errors"]) == (2, 1, 0)
+    assert status["ready"]
+
+    # Counters belong to the engine, so they outlive a disposed pool
+    engine.dispose()
+    assert pool_status(engine)["acquisitions"] == 2
+
+
+def test_uninstrumented_engines_have_no_status():
+    assert pool_status(create_engine("sqlite://")) is None
@@ -0,0 +1,18 @@
+import orjson
+
+
+def _ndjson_ids(client, auth_headers, **params):
+    response = client.get("/students/", params={"format": "ndjson", **params}, headers=auth_headers)
+    assert response.status_code == 200
+    return [orjson.loads(line)["id"] for line in response.content.splitlines()]
+
+
+def test_ndjson_export_honours_skip_and_cursor(client, auth_headers):
+    all_ids = _ndjson_ids(client, auth_headers)
+    assert len(all_ids) >= 2
+
+    assert _ndjson_ids(client, auth_headers, skip=1) == all_ids[1:]
+
+    page = client.get("/students/", params={"limit": 1}, headers=auth_headers)
+    cursor = page.headers["X-Next-Cursor"]
+    assert _ndjson_ids(client, auth_headers, cursor=cursor) == all_ids[1:]